@@ -0,0 +1,221 @@
+"""
+JDDBalance - Monte Carlo combat balance simulator for JDDGame
+
+Runs huge numbers of fights between the player character and every enemy in the GameData file, using the
+same rules as CombatManager.combat, and reports how balanced each enemy and each environment is.
+
+Fights are simulated in batches with NumPy. Every fight in a batch takes its turn at the same time, with all
+of the attack choices and damage rolls for that turn drawn as arrays, so millions of fights per enemy take
+seconds instead of the hours it would take through the game loop.
+
+Combat rules being simulated (see CombatManager.combat):
+    - The player attacks first, with an attack picked at random from the player character's attacks.
+    - The enemy then attacks back with an attack picked at random from its attack list
+      (an attack listed twice is twice as likely, or given as a dict each attack has its own weight, see GameSampler).
+    - Damage is a random whole number from the attack's damageRange (inclusive). Negative damage heals.
+    - The fight ends as soon as either side is at 0 health or below.
+
+Instructions for use:
+    - Needs NumPy (pip install numpy)
+    - python JDDBalance.py GameData.JSON
+    - python JDDBalance.py GameData.JSON --fights 1000000 --seed 7 --json balance.json
+    - python JDDBalance.py --help for the rest of the options
+"""
+
+import argparse
+import json
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from JDDGame import GameData, GameSampler
+
+
+class CombatSimulator:
+    #COMMENT Batch simulator for fights between the player character and the enemies in the game data
+    def __init__(self, game_data, player_name=None, player_health=100, max_turns=1000, seed=None):
+        if np is None:
+            raise ImportError("JDDBalance needs NumPy, install it with 'pip install numpy'")
+        self.game_data = game_data
+        #COMMENT Uses the same player character as CombatManager unless told otherwise
+        self.player_name = player_name if player_name is not None else next(iter(game_data.playerCharacter), None)
+        if self.player_name not in game_data.content.player_attacks:
+            raise ValueError(f"Player character '{self.player_name}' not found in the game data.")
+        #NOTE PlayerManager starts the player on 100 health, not the playerCharacter's health value
+        self.player_health = player_health
+        self.max_turns = max_turns
+        self.rng = np.random.default_rng(seed)
+        content = game_data.content
+        self.player_attacks = self.attack_table(content.player_attacks[self.player_name], f"Player character '{self.player_name}'")
+
+    def attack_table(self, sampler, owner):
+        #COMMENT Turns a GameSampler of attack IDs into arrays of the lowest and highest damage and the chance of each attack
+        #NOTE Uses the compiled content, so unknown attacks are left out and broken damage ranges do 0 damage, same as in
+        #NOTE the game (run python JDDGame.py GameData.JSON --check to see which)
+        content = self.game_data.content
+        if not sampler:
+            #NOTE The game can't fight with no attacks either, --check reports it as an error
+            print(f"Warning: {owner} has no usable attacks, simulating it as never doing any damage.")
+            return np.zeros(1, dtype=np.int64), np.zeros(1, dtype=np.int64), np.ones(1, dtype=np.float64)
+        low = np.array([content.attack_min[attack_id] for attack_id in sampler], dtype=np.int64)
+        high = np.array([content.attack_max[attack_id] for attack_id in sampler], dtype=np.int64)
+        chance = np.array([sampler.weight(attack_id) for attack_id in sampler], dtype=np.float64)
+        return low, high, chance / chance.sum()
+
+    def roll(self, table, count):
+        #COMMENT Picks an attack for each of count fights and rolls its damage
+        low, high, chance = table
+        picks = self.rng.choice(len(low), count, p=chance)
+        return self.rng.integers(low[picks], high[picks] + 1)
+
+    def simulate_enemy(self, enemy_name, fights, batch_size=1_000_000):
+        #COMMENT Simulates fights against one enemy, in batches so memory use doesn't grow with the number of fights
+        content = self.game_data.content
+        enemy_id = content.enemy_ids[enemy_name]
+        enemy_attacks = self.attack_table(content.enemy_attacks[enemy_id], f"Enemy '{enemy_name}'")
+        #NOTE Health left over is counted in a histogram so batches can be merged and percentiles taken at the end,
+        #NOTE enemy attacks that heal can leave the player above their starting health, those wins all go in the top bin
+        #NOTE (counted in healed) while health_sum keeps the exact total for the mean
+        health_left = np.zeros(self.player_health + 1, dtype=np.int64)
+        health_sum = healed = 0
+        wins = losses = 0
+        win_turns = loss_turns = 0
+        remaining = fights
+        while remaining > 0:
+            count = min(batch_size, remaining)
+            remaining -= count
+            player_hp = np.full(count, self.player_health, dtype=np.int64)
+            enemy_hp = np.full(count, content.enemy_health[enemy_id], dtype=np.int64)
+            active = np.arange(count)
+            for turn in range(1, self.max_turns + 1):
+                if active.size == 0:
+                    break
+                #COMMENT Player's turn
+                enemy_hp[active] -= self.roll(self.player_attacks, active.size)
+                won = enemy_hp[active] <= 0
+                won_fights = active[won]
+                wins += won_fights.size
+                win_turns += won_fights.size * turn
+                won_hp = player_hp[won_fights]
+                health_left += np.bincount(np.clip(won_hp, 0, self.player_health), minlength=self.player_health + 1)
+                health_sum += int(won_hp.sum())
+                healed += int((won_hp > self.player_health).sum())
+                active = active[~won]
+                #COMMENT Enemy's turn
+                player_hp[active] -= self.roll(enemy_attacks, active.size)
+                lost = player_hp[active] <= 0
+                losses += int(lost.sum())
+                loss_turns += int(lost.sum()) * turn
+                active = active[~lost]
+        unresolved = fights - wins - losses
+        return {
+            'enemy': enemy_name,
+            'fights': fights,
+            'win_rate': wins / fights if fights else 0.0,
+            'loss_rate': losses / fights if fights else 0.0,
+            'unresolved_rate': unresolved / fights if fights else 0.0,
+            'avg_turns_win': win_turns / wins if wins else None,
+            'avg_turns_loss': loss_turns / losses if losses else None,
+            'health_left_on_win': CombatSimulator.distribution(health_left, health_sum),
+            'healed_rate_on_win': healed / wins if wins else 0.0,
+        }
+
+    @staticmethod
+    def distribution(histogram, value_sum=None):
+        #COMMENT Mean and percentiles of a histogram where the index is the value
+        #NOTE value_sum is the exact total of the values, for when the top bin also holds the values above it
+        total = int(histogram.sum())
+        if total == 0:
+            return None
+        if value_sum is None:
+            value_sum = int((np.arange(histogram.size) * histogram).sum())
+        cumulative = np.cumsum(histogram)
+        summary = {'mean': value_sum / total}
+        for percentile in (5, 25, 50, 75, 95):
+            summary[f"p{percentile}"] = int(np.searchsorted(cumulative, total * percentile / 100))
+        return summary
+
+    def simulate_all(self, fights, batch_size=1_000_000, enemy_names=None):
+        #COMMENT Simulates every enemy (or the ones asked for) and returns their results by name
+        names = enemy_names if enemy_names is not None else list(self.game_data.enemies)
+        return {name: self.simulate_enemy(name, fights, batch_size) for name in names}
+
+    def environment_report(self, enemy_results):
+        #COMMENT Combines enemy results into odds for each environment, weighted by its enemy list
+        #NOTE Enemies are weighted the same as choose_enemy weights them, listed twice is encountered twice as often
+        report = {}
+        for env_name, env in self.game_data.environments.items():
+            sampler = GameSampler.build(env.get('enemies', ()), {name: name for name in enemy_results})
+            if not sampler:
+                continue
+            encounters = {name: sampler.weight(name) for name in sampler}
+            win_rate = sum(enemy_results[name]['win_rate'] * chance for name, chance in encounters.items())
+            loss_rate = sum(enemy_results[name]['loss_rate'] * chance for name, chance in encounters.items())
+            deadliest = max(encounters, key=lambda name: enemy_results[name]['loss_rate'])
+            report[env_name] = {
+                'encounters': encounters,
+                'win_rate': win_rate,
+                'loss_rate': loss_rate,
+                'deadliest_enemy': deadliest,
+            }
+        return report
+
+
+def format_report(enemy_results, environment_results, player_health=100):
+    #COMMENT Lays the results out as two text tables
+    #NOTE Health percentiles at the starting health get a + if some wins ended healed above it, see simulate_enemy
+    lines = [f"{'Enemy':<22}{'Win %':>8}{'Loss %':>8}{'Stuck %':>9}{'Turns':>8}{'HP left p5/p50/p95':>22}"]
+    for name, result in sorted(enemy_results.items(), key=lambda item: item[1]['win_rate']):
+        turns = f"{result['avg_turns_win']:.1f}" if result['avg_turns_win'] is not None else '-'
+        health = result['health_left_on_win']
+        if health:
+            plus = '+' if result['healed_rate_on_win'] else ''
+            health = "/".join(f"{health[key]}{plus if health[key] >= player_health else ''}" for key in ('p5', 'p50', 'p95'))
+        else:
+            health = '-'
+        lines.append(f"{name:<22}{result['win_rate'] * 100:>8.2f}{result['loss_rate'] * 100:>8.2f}"
+                     f"{result['unresolved_rate'] * 100:>9.2f}{turns:>8}{health:>22}")
+    lines.append("")
+    lines.append(f"{'Environment':<52}{'Win %':>8}{'Loss %':>8}  Deadliest Enemy")
+    for name, result in sorted(environment_results.items(), key=lambda item: item[1]['win_rate']):
+        lines.append(f"{name:<52}{result['win_rate'] * 100:>8.2f}{result['loss_rate'] * 100:>8.2f}  {result['deadliest_enemy']}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    #COMMENT Command line entry point
+    parser = argparse.ArgumentParser(description="Monte Carlo combat balance report for JDDGame.")
+    parser.add_argument('gamedata', help="Path to the GameData.JSON file")
+    parser.add_argument('--fights', type=int, default=100_000, help="Fights to simulate per enemy")
+    parser.add_argument('--batch-size', type=int, default=1_000_000, help="Fights simulated at once, lower it to use less memory")
+    parser.add_argument('--player', default=None, help="Player character to simulate, defaults to the first one")
+    parser.add_argument('--player-health', type=int, default=100, help="Health the player starts each fight with")
+    parser.add_argument('--max-turns', type=int, default=1000, help="Turns before a fight is counted as stuck")
+    parser.add_argument('--enemy', action='append', help="Only simulate this enemy, can be given more than once")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for repeatable results")
+    parser.add_argument('--json', dest='json_path', default=None, help="Also save the full report to this file")
+    args = parser.parse_args(argv)
+
+    if np is None:
+        print("JDDBalance needs NumPy, install it with 'pip install numpy'")
+        return 1
+    game_data = GameData.load(args.gamedata)
+    unknown = [name for name in args.enemy or [] if name not in game_data.enemies]
+    if unknown:
+        parser.error(f"unknown enemy {', '.join(repr(name) for name in unknown)}, choose from {', '.join(game_data.enemies)}")
+    simulator = CombatSimulator(game_data, args.player, args.player_health, args.max_turns, args.seed)
+    enemy_results = simulator.simulate_all(args.fights, args.batch_size, args.enemy)
+    environment_results = simulator.environment_report(enemy_results)
+    print(format_report(enemy_results, environment_results, args.player_health))
+    if args.json_path:
+        with open(args.json_path, 'w') as file:
+            json.dump({'player': simulator.player_name, 'player_health': args.player_health,
+                       'enemies': enemy_results, 'environments': environment_results}, file, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""
+JDDBench - Benchmark suite for the JDDGame engine
+
+Runs scripted, headless workloads against the real game classes and reports how fast each one is, so changes
+to the engine can be measured and compared between builds.
+
+Workloads:
+    - startup: Building a new GameState from an already loaded GameData, what a session costs before its first menu.
+      The managers are made on first use, so this doesn't include them (numbers from before that change include them all).
+    - startup_full: Same, then making every manager, what a session costs once the player has done a bit of everything.
+    - menu_render: GameUI.create_and_display_menu on the game menu, with the menu already cached.
+    - menu_build: Same, but with the menu cache emptied first so the menu is built from the game data every time.
+    - move: GameEngine.move, walking a route that sweeps back and forth over the whole grid.
+    - search: EnvironmentManager.search_area, over and over at locations that have enemies and loot.
+    - combat: CombatManager.combat, a whole fight from encounter to result, at every location that has enemies.
+
+Each workload runs in its own session with pauses skipped (time scale 0), output thrown away and a fixed seed,
+so runs of the same build do the same work. Every operation is timed on its own and the results are reported as
+operations per second plus latency percentiles.
+
+Instructions for use:
+    - python JDDBench.py GameData.JSON
+    - python JDDBench.py GameData.JSON --ops 20000 --only move --only combat
+    - python JDDBench.py GameData.JSON --json new.json --compare old.json
+    - python JDDBench.py --help for the rest of the options
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+from JDDGame import GameData, GameState, GameEngine, GameUI
+from JDDMenu_v2_6 import JDDMenuIO
+
+
+class RepeatingInput:
+    #COMMENT Input stream that gives the same line forever, so a menu can be displayed and left as many times as needed
+    def __init__(self, line):
+        self.line = line + "\n"
+
+    def readline(self):
+        return self.line
+
+
+class BenchmarkSuite:
+    #COMMENT Sets up sessions for each workload and times them
+    WORKLOADS = ('startup', 'startup_full', 'menu_render', 'menu_build', 'move', 'search', 'combat')
+    PERCENTILES = (50, 90, 99)
+    #COMMENT The GameState managers, each one is made the first time it is used
+    MANAGERS = ('environment_manager', 'player_manager', 'inventory_manager', 'npc_manager', 'combat_manager', 'quest_manager')
+
+    def __init__(self, gamedata_path, seed=1):
+        self.gamedata_path = gamedata_path
+        self.seed = seed
+        self.game_data = GameData.load(gamedata_path)
+        self.null = open(os.devnull, 'w')
+        self.save_dir = tempfile.TemporaryDirectory()
+
+    def close(self):
+        self.null.close()
+        self.save_dir.cleanup()
+
+    def session(self, start=(3, 1)):
+        #COMMENT A headless session standing at start, menus read '0' (leave the menu) whenever they ask for input
+        menu_io = JDDMenuIO(input_stream=RepeatingInput('0'), output_stream=self.null)
+        game_state = GameState(self.gamedata_path, game_data=self.game_data, time_scale=0, io=menu_io,
+                               save_path=os.path.join(self.save_dir.name, 'bench.jddsave'), seed=self.seed)
+        game_engine = GameEngine(game_state=game_state, config_path=self.gamedata_path)
+        game_ui = GameUI(game_state=game_state, game_engine=game_engine, config_path=self.gamedata_path, game_data=self.game_data)
+        self.place(game_state, start)
+        return game_state, game_engine, game_ui
+
+    @staticmethod
+    def place(game_state, location):
+        #COMMENT Puts the player somewhere without going through a move
+        game_state.player_position = list(location)
+        game_state.environment_manager.current_location = game_state.player_position
+        game_state.environment_manager.update_environment()
+
+    def locations(self, key):
+        #COMMENT Grid locations of every environment with something in key ('enemies' or 'lootPool')
+        world = self.game_data.world
+        return [world.coordinates[name] for name, env in self.game_data.environments.items()
+                if env.get(key) and name in world.coordinates]
+
+    def workload(self, name):
+        #COMMENT Returns (operation, prepare) for a workload, prepare (or None) runs untimed before each operation
+        if name == 'startup':
+            return (lambda: GameState(self.gamedata_path, game_data=self.game_data, time_scale=0, seed=self.seed)), None
+
+        if name == 'startup_full':
+            def startup_full():
+                game_state = GameState(self.gamedata_path, game_data=self.game_data, time_scale=0, seed=self.seed)
+                for manager in BenchmarkSuite.MANAGERS:
+                    getattr(game_state, manager)
+            return startup_full, None
+
+        if name in ('menu_render', 'menu_build'):
+            game_state, game_engine, game_ui = self.session()
+            render = lambda: game_ui.create_and_display_menu('gameMenu')
+            return render, (game_ui.invalidate_menus if name == 'menu_build' else None)
+
+        if name == 'move':
+            game_state, game_engine, game_ui = self.session(start=(0, 0))
+            #NOTE Sweeps east and west along each row, stepping south between them, then retraces the route back north
+            route = []
+            for row in range(game_state.grid_height):
+                route += ['e' if row % 2 == 0 else 'w'] * (game_state.grid_width - 1) + ['s']
+            route.pop()
+            route += [{'n': 's', 's': 'n', 'e': 'w', 'w': 'e'}[step] for step in reversed(route)]
+            steps = iter(())
+
+            def move():
+                nonlocal steps
+                step = next(steps, None)
+                if step is None:
+                    steps = iter(route)
+                    step = next(steps)
+                game_engine.move(step)
+            return move, None
+
+        if name in ('search', 'combat'):
+            places = self.locations('lootPool' if name == 'search' else 'enemies')
+            if name == 'search':
+                #NOTE Locations with both, so searches go down both the loot and the encounter branch
+                enemy_places = self.locations('enemies')
+                places = [place for place in places if place in enemy_places] or places
+            game_state, game_engine, game_ui = self.session(start=places[0])
+            visit = iter(())
+
+            def prepare():
+                #COMMENT Moves on to the next location and resets anything the last operation used up
+                nonlocal visit
+                place = next(visit, None)
+                if place is None:
+                    visit = iter(places)
+                    place = next(visit)
+                self.place(game_state, place)
+                game_state.player_manager.health = 100
+                game_state.player_manager.quests_complete = 0
+                game_state.inventory_manager.clear()
+                game_state.current_state = GameState.EXPLORING
+
+            operation = game_state.environment_manager.search_area if name == 'search' else game_state.combat_manager.combat
+            return operation, prepare
+
+        raise ValueError(f"Unknown workload '{name}', pick from {', '.join(BenchmarkSuite.WORKLOADS)}")
+
+    def run(self, name, ops, warmup):
+        #COMMENT Times ops operations of a workload (after warmup untimed ones), returns its summary
+        with contextlib.redirect_stdout(self.null):
+            operation, prepare = self.workload(name)
+            latencies = []
+            for index in range(warmup + ops):
+                if prepare is not None:
+                    prepare()
+                start = time.perf_counter_ns()
+                try:
+                    operation()
+                except SystemExit:
+                    #NOTE Losing a fight (or finishing the game) calls exit(), that still counts as a finished operation
+                    pass
+                elapsed = time.perf_counter_ns() - start
+                if index >= warmup:
+                    latencies.append(elapsed)
+        return BenchmarkSuite.summarize(name, latencies)
+
+    @staticmethod
+    def summarize(name, latencies):
+        #COMMENT Operations per second and latency percentiles (in microseconds) of a list of nanosecond timings
+        latencies = sorted(latencies)
+        total = sum(latencies)
+        summary = {'workload': name, 'ops': len(latencies),
+                   'ops_per_sec': len(latencies) / (total / 1e9) if total else 0.0,
+                   'mean_us': total / len(latencies) / 1000 if latencies else 0.0}
+        for percentile in BenchmarkSuite.PERCENTILES:
+            index = min(len(latencies) - 1, len(latencies) * percentile // 100)
+            summary[f"p{percentile}_us"] = latencies[index] / 1000 if latencies else 0.0
+        summary['max_us'] = latencies[-1] / 1000 if latencies else 0.0
+        return summary
+
+
+def format_report(results, baseline=None):
+    #COMMENT Lays the results out as a text table, with the change against a baseline run if one is given
+    header = f"{'Workload':<14}{'ops/sec':>12}{'mean us':>10}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>11}"
+    lines = [header + ("  vs baseline" if baseline else "")]
+    baseline_results = {result['workload']: result for result in baseline['results']} if baseline else {}
+    for result in results:
+        line = (f"{result['workload']:<14}{result['ops_per_sec']:>12,.0f}{result['mean_us']:>10.1f}{result['p50_us']:>10.1f}"
+                f"{result['p90_us']:>10.1f}{result['p99_us']:>10.1f}{result['max_us']:>11.1f}")
+        before = baseline_results.get(result['workload'])
+        if before and before['ops_per_sec']:
+            line += f"  {result['ops_per_sec'] / before['ops_per_sec']:.2f}x"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    #COMMENT Command line entry point
+    parser = argparse.ArgumentParser(description="Benchmark suite for the JDDGame engine.")
+    parser.add_argument('gamedata', help="Path to the GameData.JSON file")
+    parser.add_argument('--ops', type=int, default=5000, help="Timed operations per workload")
+    parser.add_argument('--warmup', type=int, default=200, help="Untimed operations run first")
+    parser.add_argument('--only', action='append', choices=BenchmarkSuite.WORKLOADS, help="Only run this workload, can be given more than once")
+    parser.add_argument('--seed', type=int, default=1, help="Session seed, keep it the same to compare builds")
+    parser.add_argument('--json', dest='json_path', default=None, help="Also save the results to this file")
+    parser.add_argument('--compare', default=None, help="Results file from an earlier run to compare against")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    suite = BenchmarkSuite(args.gamedata, args.seed)
+    try:
+        results = [suite.run(name, args.ops, args.warmup) for name in (args.only or BenchmarkSuite.WORKLOADS)]
+    finally:
+        suite.close()
+    print(format_report(results, baseline))
+    if args.json_path:
+        with open(args.json_path, 'w') as file:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(), 'time': time.time(),
+                       'gamedata': args.gamedata, 'seed': args.seed, 'ops': args.ops, 'warmup': args.warmup,
+                       'results': results}, file, indent=4)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,51 @@
 from JDDMenu_v2_6 import * 
 import random
+import argparse
 import sys
 import os
 import time
 import json
+import pickle
+import hashlib
+import gc
+import contextlib
+import functools
+import tempfile
+import cProfile
+from io import StringIO, BytesIO
+import mmap
+import struct
+from collections import OrderedDict
+from array import array
+from types import MappingProxyType
+from collections.abc import Mapping
+try:
+    import orjson  # Optional, decodes large GameData files several times faster than json
+except ImportError:
+    orjson = None
 
 """
 Instructions for use:
     - Change the file path in main() to the file path to your copy of the GameData.JSON file
     - Make sure JDDMenu_v2_6 is in the same file as your Copy of the Game so that it can be easily imported.
+    - Or pass the file path when running the game: python JDDGame.py path/to/GameData.JSON
+    - Run python JDDGame.py path/to/GameData.JSON --check to find broken references in the game data after editing it.
+    - The attacks, enemies and lootPool lists in the game data can also be written as {"name": weight, ...} to set
+      exactly how likely each one is, instead of repeating names in a list.
+    - Quests are updated by the triggers in the quests section of the game data (an enemy defeated, an NPC talked to,
+      an item obtained), see QuestManager.
+    - Travel in the game menu takes the player anywhere on the map along the shortest route. An environment can list
+      others in "links" (like the teleportation circles), the route can step between linked environments in one go.
+      Travel only works on the map in the game data, not on a world pack.
+    - Maps too big to keep in memory can be packed into chunks and streamed in as the player moves:
+        python JDDGame.py path/to/BigWorld.JSON --pack path/to/BigWorld.jddpack [--chunk-size 16]
+        python JDDGame.py path/to/GameData.JSON --world path/to/BigWorld.jddpack
+    - Save Game in the game menu and Load Game in the main menu use JDDGame.jddsave in the current folder,
+      set the JDDGAME_SAVE environment variable or pass --save path/to/file.jddsave to use a different file.
+    - To reproduce a bug, play with --record session.jddrec and then python JDDGame.py path/to/GameData.JSON --replay session.jddrec
+    - To find what is slow, play with --metrics metrics.json (call counts and latencies of every action) and/or
+      --profile session.prof (a cProfile of the whole session).
+    - Set the JDDGAME_TIME_SCALE environment variable to change how long the game pauses for, 0 skips the pauses (useful for testing).
 
     - Please email jdd310@gmail.com with the subject line "JDDGame_Bug" if you find any bugs.
 
@@ -24,7 +61,7 @@ Instructions for use:
             * I want to do this for two reasons, I need to learn java and this is a perfect way to do it, and 
               porting to java could help make this easier to work on, because i actually have access to real object oriented
               programming instead of just kind of bastardizing it which is what i feel like i've been doing so far. 
-        TODO Impliment Save States. 
+        DONE Impliment Save States. 
             * I want a player to be able to save their game state to the machine, and be able to load it at any time. 
             * Implimenting auto-saving would probably be too much, but doing it manually could help me a lot.
         TODO Combat Overhaul 
@@ -90,47 +127,1125 @@ Instructions for use:
                   terminal would probably help a lot for the user's end experience. 
 """
 
+class GameData:
+    #COMMENT Read-only repository for everything in the GameData file.
+    #NOTE The file is parsed exactly once, and the same instance is handed to every manager and the UI.
+    #NOTE Sections are frozen (dicts become mappingproxies, lists become tuples) so no session can edit shared data.
+    SECTIONS = ('menus', 'environments', 'items', 'characters', 'enemies', 'attacks', 'playerCharacter', 'quests')
+
+    def __init__(self, data, filepath=None, indexes=None):
+        self.filepath = filepath
+        #COMMENT Derived lookup tables, either taken from the compiled cache or built here
+        indexes = indexes if indexes is not None else GameData.build_indexes(data)
+        self.content = GameContent.from_tables(indexes['content'])
+        self.world = GameWorld.from_tables(indexes['world'])
+        for section in GameData.SECTIONS:
+            value = data.get(section, {})
+            #COMMENT Ensure each section exists and is correctly formatted
+            if not isinstance(value, dict):
+                print(f"{section} data is missing or corrupt.")
+                value = {}
+            setattr(self, section, GameDataSection(value))
+
+    @classmethod
+    def load(cls, filepath, use_cache=True):
+        #COMMENT Parse the GameData file and wrap it in a repository
+        #NOTE Goes through the compiled cache unless told not to, falling back to a plain parse if it can't be used
+        if use_cache:
+            compiled = GameDataCache(filepath).load()
+            if compiled is not None:
+                data, indexes = compiled
+                return cls(data, filepath, indexes)
+        return cls(GameUtils.load_data(filepath), filepath)
+
+    @staticmethod
+    def build_indexes(data):
+        #COMMENT Builds the lookup tables that are derived from the raw data, these get stored in the compiled cache
+        #COMMENT Validated content with every entity interned to an integer ID
+        content = GameContent.compile(data)
+        #COMMENT Spatial index of the map, its problems are reported alongside the content's
+        world = GameWorld.build(data, content)
+        #NOTE Both are stored as their plain tables so the cache never depends on which module the classes were pickled from
+        return {'content': content.tables(), 'world': world.tables()}
+
+    @staticmethod
+    def freeze(value):
+        #COMMENT Recursively turns JSON data into read-only views
+        if isinstance(value, dict):
+            return MappingProxyType({key: GameData.freeze(item) for key, item in value.items()})
+        if isinstance(value, list):
+            return tuple(GameData.freeze(item) for item in value)
+        return value
+
+    def section(self, name):
+        #COMMENT Looks up a section by name, used where the key is only known at runtime
+        return getattr(self, name) if name in GameData.SECTIONS else MappingProxyType({})
+
+
+class GameDataSection(Mapping):
+    #COMMENT Read-only view of one section of the GameData file
+    #NOTE Entries are frozen the first time they are looked up instead of all at load, which
+    #NOTE keeps cold start down to just the decode for big content files where most entries are never touched.
+    __slots__ = ('_raw', '_frozen')
+
+    def __init__(self, raw):
+        self._raw = raw
+        self._frozen = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._frozen[key]
+        except KeyError:
+            value = self._frozen[key] = GameData.freeze(self._raw[key])
+            return value
+
+    def __contains__(self, key):
+        return key in self._raw
+
+    def __iter__(self):
+        return iter(self._raw)
+
+    def __len__(self):
+        return len(self._raw)
+
+
+class GameDataCache:
+    #COMMENT On-disk compiled copy of the GameData file, so new sessions skip JSON decoding and index building.
+    #NOTE The cache sits next to the source file and is keyed by its size, mtime and content hash,
+    #NOTE so any edit to the GameData file rebuilds it automatically on the next launch.
+    MAGIC = b'JDDC'
+    VERSION = 8
+    SUFFIX = '.jddcache'
+    #COMMENT The only classes a cache may hold, (module, name) as pickle stores them
+    #NOTE Anything else is stored by the module it was defined in, which is __main__ when the game is run directly,
+    #NOTE so a cache the console game wrote couldn't be read by the server or the tools (and the other way around)
+    PLAIN_GLOBALS = frozenset({('array', 'array'), ('array', '_array_reconstructor')})
+
+    class Unpickler(pickle.Unpickler):
+        #COMMENT Reads a cache, refusing any class that isn't in PLAIN_GLOBALS
+        def find_class(self, module, name):
+            if (module, name) not in GameDataCache.PLAIN_GLOBALS:
+                raise pickle.UnpicklingError(f"The compiled cache can't hold {module}.{name}, only plain data.")
+            return super().find_class(module, name)
+
+    def __init__(self, filepath, cache_path=None):
+        self.filepath = filepath
+        self.cache_path = cache_path if cache_path is not None else filepath + GameDataCache.SUFFIX
+
+    def load(self):
+        #COMMENT Returns (data, indexes) from the cache, rebuilding it first if it is missing or stale
+        try:
+            stat = os.stat(self.filepath)
+        except OSError:
+            return None
+        with GameUtils.gc_paused():
+            header, payload = self.read()
+        if header is not None and header['size'] == stat.st_size and header['mtime_ns'] == stat.st_mtime_ns:
+            return payload
+        try:
+            with open(self.filepath, 'rb') as file:
+                raw = file.read()
+        except OSError:
+            return None
+        digest = hashlib.blake2b(raw, digest_size=16).hexdigest()
+        #COMMENT Same content with a new mtime (copied or touched file), reuse the payload and just refresh the key
+        if header is None or header['digest'] != digest:
+            try:
+                with GameUtils.gc_paused():
+                    data = GameUtils.decode_json(raw)
+            except ValueError:
+                return None
+            payload = (data, GameData.build_indexes(data))
+        self.write({'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'digest': digest}, payload)
+        return payload
+
+    def read(self):
+        #COMMENT Reads the header and payload of the cache file, any problem at all just counts as a cache miss
+        try:
+            with open(self.cache_path, 'rb') as file:
+                if file.read(len(GameDataCache.MAGIC)) != GameDataCache.MAGIC:
+                    return None, None
+                header = GameDataCache.Unpickler(file).load()
+                if header.get('version') != GameDataCache.VERSION:
+                    return None, None
+                return header, GameDataCache.Unpickler(file).load()
+        except Exception:
+            return None, None
+
+    @staticmethod
+    def plain(payload):
+        #COMMENT Returns None if payload can be read back from a cache by any program, or what stops it if not
+        try:
+            GameDataCache.Unpickler(BytesIO(pickle.dumps(payload, protocol=pickle.HIGHEST_PROTOCOL))).load()
+        except pickle.UnpicklingError as error:
+            return str(error)
+        return None
+
+    def write(self, header, payload):
+        #COMMENT Writes to a temp file and swaps it in so a half written cache is never read
+        #NOTE A read-only install just runs without a cache
+        header = dict(header, version=GameDataCache.VERSION)
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(GameDataCache.MAGIC)
+                pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+                pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+
+class GameDataImage:
+    #COMMENT The whole compiled game data laid out flat in one buffer, so it can sit in shared memory and be used in place.
+    #NOTE Section entries are stored as JSON and only decoded (and frozen) when a process looks them up, and the big
+    #NOTE numeric tables (damage ranges, health, the map grid) are read straight out of the buffer through memoryviews,
+    #NOTE so every process that opens the same image shares one copy. Each process only builds the small lookup
+    #NOTE tables (names and IDs) and the entries its sessions actually touch.
+    #NOTE Layout is MAGIC, version, header length, a JSON header of where everything is, then the body (8 byte aligned).
+    MAGIC = b'JDDI'
+    VERSION = 1
+    PREFIX = struct.Struct('<4sHI')
+    #COMMENT (table, field, memoryview format) of the tables that are used in place
+    ARRAYS = (('content', 'attack_min', 'q'), ('content', 'attack_max', 'q'), ('content', 'enemy_health', 'q'),
+              ('content', 'item_listed', 'B'), ('content', 'item_values', 'q'), ('world', 'tiles', 'q'),
+              ('world', 'next_hop', 'i'), ('world', 'distance', 'i'))
+
+    @classmethod
+    def build(cls, game_data):
+        #COMMENT Lays a GameData out as an image, returns it as bytes
+        body = bytearray()
+
+        def place(raw):
+            #NOTE Everything starts on an 8 byte boundary so the int64 tables can be cast in place
+            body.extend(bytes(-len(body) % 8))
+            offset = len(body)
+            body.extend(raw)
+            return [offset, len(raw)]
+
+        header = {'sections': {}, 'arrays': {}}
+        for section in GameData.SECTIONS:
+            #NOTE Reads the raw entries instead of the frozen ones, JSON can't encode mappingproxies
+            raw = getattr(game_data, section)._raw
+            header['sections'][section] = {key: place(GameUtils.encode_json(value)) for key, value in raw.items()}
+        tables = {'content': game_data.content.tables(), 'world': game_data.world.tables()}
+        for table, field, _ in cls.ARRAYS:
+            header['arrays'][f"{table}.{field}"] = place(bytes(tables[table].pop(field)))
+        #NOTE The rest is small (names, ID maps) and has tuple keys JSON can't hold, so it is pickled
+        header['tables'] = place(pickle.dumps(tables, protocol=pickle.HIGHEST_PROTOCOL))
+        encoded = GameUtils.encode_json(header)
+        prefix = cls.PREFIX.pack(cls.MAGIC, cls.VERSION, len(encoded)) + encoded
+        return prefix + bytes(-len(prefix) % 8) + body
+
+    @classmethod
+    def load(cls, buffer, filepath=None):
+        #COMMENT Opens an image from build() as a GameData, without copying the buffer
+        #NOTE The buffer has to stay open for as long as the GameData is used
+        view = memoryview(buffer)
+        magic, version, header_length = cls.PREFIX.unpack_from(view, 0)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError(f"Not a version {cls.VERSION} game data image.")
+        header_end = cls.PREFIX.size + header_length
+        header = GameUtils.decode_json(bytes(view[cls.PREFIX.size:header_end]))
+        body = view[header_end + (-header_end % 8):]
+
+        def placed(location):
+            offset, length = location
+            return body[offset:offset + length]
+
+        tables = pickle.loads(placed(header['tables']))
+        for table, field, view_format in cls.ARRAYS:
+            tables[table][field] = placed(header['arrays'][f"{table}.{field}"]).cast(view_format)
+        game_data = GameData.__new__(GameData)
+        game_data.filepath = filepath
+        game_data.content = GameContent.from_tables(tables['content'])
+        game_data.world = GameWorld.from_tables(tables['world'])
+        for section in GameData.SECTIONS:
+            setattr(game_data, section, GameDataImage.Section(body, header['sections'][section]))
+        return game_data
+
+    class Section(GameDataSection):
+        #COMMENT A GameDataSection whose entries are still encoded in an image, each is decoded the first time it is looked up
+        __slots__ = ('_body',)
+
+        def __init__(self, body, index):
+            super().__init__(index)
+            self._body = body
+
+        def __getitem__(self, key):
+            try:
+                return self._frozen[key]
+            except KeyError:
+                offset, length = self._raw[key]
+                value = self._frozen[key] = GameData.freeze(GameUtils.decode_json(bytes(self._body[offset:offset + length])))
+                return value
+
+
+class GameSampler:
+    #COMMENT Weighted random pick in O(1), using Vose's alias method. Built once when the data is loaded, every draw
+    #COMMENT after that is one random number, one multiply and one comparison however many entries there are.
+    #NOTE Built from a list in the data every entry counts once, so repeating an entry still makes it more likely the way it
+    #NOTE always has. A dict of name to weight ({"Fireball": 3, "Bite": 1.5}) gives each entry its own weight instead.
+    __slots__ = ('values', 'probability', 'alias')
+
+    def __init__(self, weights=None):
+        #COMMENT weights maps each value to its weight, all above 0, they don't need to add up to anything
+        weights = dict(weights) if weights else {}
+        self.values = tuple(weights)
+        count = len(self.values)
+        total = sum(weights.values())
+        scaled = [weight * count / total for weight in weights.values()]
+        probability = [1.0] * count
+        alias = list(range(count))
+        small = [index for index, weight in enumerate(scaled) if weight < 1]
+        large = [index for index, weight in enumerate(scaled) if weight >= 1]
+        #NOTE Each slot holds its own value with probability[slot] and its alias the rest of the time
+        while small and large:
+            short, tall = small.pop(), large.pop()
+            probability[short] = scaled[short]
+            alias[short] = tall
+            scaled[tall] -= 1 - scaled[short]
+            (small if scaled[tall] < 1 else large).append(tall)
+        self.probability = tuple(probability)
+        self.alias = tuple(alias)
+
+    @classmethod
+    def build(cls, entries, ids=None, report=None, kind='entry'):
+        #COMMENT Builds a sampler from a list or dict in the data, see above
+        #NOTE With ids the names are drawn as their IDs and names with no ID are left out, without ids the names are drawn
+        #NOTE report(level, message) is told about every entry that was left out, if given
+        weights = {}
+        pairs = entries.items() if isinstance(entries, Mapping) else ((name, 1) for name in entries)
+        for name, weight in pairs:
+            if isinstance(weight, bool) or not isinstance(weight, (int, float)) or not 0 < weight < float('inf'):
+                if report is not None:
+                    report(GameContent.WARNING, f"gives {kind} '{name}' the weight {weight!r}, weights have to be numbers above 0")
+                continue
+            if ids is not None:
+                if name not in ids:
+                    if report is not None:
+                        report(GameContent.ERROR, f"references {kind} '{name}', which does not exist")
+                    continue
+                name = ids[name]
+            weights[name] = weights.get(name, 0) + weight
+        return cls(weights)
+
+    def tables(self):
+        #COMMENT The sampler as plain tuples, for storing in the compiled cache
+        return self.values, self.probability, self.alias
+
+    @classmethod
+    def from_tables(cls, tables):
+        #COMMENT Rebuilds a sampler from tables(), without working out the alias table again
+        sampler = cls.__new__(cls)
+        sampler.values, sampler.probability, sampler.alias = tables
+        return sampler
+
+    def draw(self, rng):
+        #COMMENT Picks a value with the random.Random given, the sampler must not be empty
+        position = rng.random() * len(self.values)
+        slot = int(position)
+        return self.values[slot] if position - slot < self.probability[slot] else self.values[self.alias[slot]]
+
+    def weight(self, value):
+        #COMMENT Chance of drawing value, from 0 to 1
+        count = len(self.values)
+        chance = sum(self.probability[slot] for slot in range(count) if self.values[slot] == value)
+        chance += sum(1 - self.probability[slot] for slot in range(count) if self.values[self.alias[slot]] == value)
+        return chance / count if count else 0.0
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        return iter(self.values)
+
+
+class GameContent:
+    #COMMENT Compiled form of the game data. Every attack, enemy, item and environment is interned to a dense
+    #COMMENT integer ID, and their fields are kept in tuples and arrays indexed by that ID.
+    #NOTE Built once by compile() (and kept in the compiled cache), so every cross reference in the data is
+    #NOTE checked a single time at load and runtime lookups are just indexing. Treat it as read-only.
+    ERROR = 'error'
+    WARNING = 'warning'
+    #COMMENT Game events quests can be triggered by, see QuestManager
+    EVENTS = ('enemy_defeated', 'npc_talked', 'item_obtained')
+    #COMMENT Fields holding a GameSampler for each ID, see tables
+    SAMPLER_LISTS = ('enemy_attacks', 'environment_enemies', 'environment_loot')
+
+    def __init__(self):
+        #COMMENT Attacks
+        self.attack_names = []
+        self.attack_ids = {}
+        self.attack_descriptions = []
+        self.attack_min = array('q')
+        self.attack_max = array('q')
+        #COMMENT Enemies, enemy_attacks holds a GameSampler of attack IDs for each enemy
+        self.enemy_names = []
+        self.enemy_ids = {}
+        self.enemy_descriptions = []
+        self.enemy_health = array('q')
+        self.enemy_attacks = []
+        #COMMENT Items, including loot that has no entry in the items table (item_listed is 0 for those)
+        #COMMENT Each has its type from the items table ('money', 'equip', ...) and its value, '' and 0 for unlisted loot
+        self.item_names = []
+        self.item_ids = {}
+        self.item_listed = bytearray()
+        self.item_types = []
+        self.item_values = array('q')
+        #COMMENT Environments, with GameSamplers of the enemy IDs and the item names that can be found in each
+        self.environment_names = []
+        self.environment_ids = {}
+        self.environment_enemies = []
+        self.environment_loot = []
+        #COMMENT Player characters by name, with a GameSampler of attack IDs each
+        self.player_attacks = {}
+        #COMMENT (event, subject) to a tuple of (quest name, status) for every quest trigger waiting on it
+        self.quest_triggers = {}
+        #COMMENT (level, message) for every problem found while compiling
+        self.problems = []
+
+    @classmethod
+    def compile(cls, data):
+        #COMMENT Validates every reference in the raw data and builds the ID tables
+        content = cls()
+        strings = {}
+
+        def text(value):
+            #COMMENT Dedupes repeated strings (shared descriptions and names) so each is only stored once
+            value = str(value)
+            return strings.setdefault(value, sys.intern(value) if len(value) < 64 else value)
+
+        def section(name):
+            value = data.get(name, {})
+            return value if isinstance(value, dict) else {}
+
+        for name, attack in section('attacks').items():
+            damage_range = attack.get('damageRange', [])
+            if len(damage_range) != 2 or damage_range[0] > damage_range[1]:
+                content.problem(GameContent.WARNING, f"Attack '{name}' has an invalid damageRange {damage_range}, it will do 0 damage.")
+                damage_range = (0, 0)
+            content.attack_ids[text(name)] = len(content.attack_names)
+            content.attack_names.append(text(name))
+            content.attack_descriptions.append(text(attack.get('description', '')))
+            content.attack_min.append(damage_range[0])
+            content.attack_max.append(damage_range[1])
+
+        for name, enemy in section('enemies').items():
+            content.enemy_ids[text(name)] = len(content.enemy_names)
+            content.enemy_names.append(text(enemy.get('name', name)))
+            content.enemy_descriptions.append(text(enemy.get('description', 'No description available.')))
+            content.enemy_health.append(enemy.get('health', 0))
+            content.enemy_attacks.append(content.resolve_weights(enemy.get('attacks', []), content.attack_ids, f"Enemy '{name}'", 'attack'))
+            if not content.enemy_attacks[-1]:
+                content.problem(GameContent.ERROR, f"Enemy '{name}' has no usable attacks.")
+
+        for name, item in section('items').items():
+            item = item if isinstance(item, dict) else {}
+            value = item.get('value', 0)
+            if isinstance(value, bool) or not isinstance(value, int):
+                content.problem(GameContent.WARNING, f"Item '{name}' has an invalid value {value!r}, it will be worth 0.")
+                value = 0
+            content.intern_item(text(name), listed=True, item_type=text(item.get('type', '')), value=value)
+
+        for name, env in section('environments').items():
+            content.environment_ids[text(name)] = len(content.environment_names)
+            content.environment_names.append(text(name))
+            content.environment_enemies.append(content.resolve_weights(env.get('enemies', []), content.enemy_ids, f"Environment '{name}'", 'enemy'))
+            loot = content.resolve_weights(env.get('lootPool', []), None, f"Environment '{name}'", 'loot')
+            for item in loot.values:
+                if item not in content.item_ids:
+                    content.problem(GameContent.WARNING, f"Environment '{name}' has loot '{item}' with no entry in items.")
+                content.intern_item(text(item), listed=False)
+            content.environment_loot.append(loot)
+
+        for name, player in section('playerCharacter').items():
+            content.player_attacks[text(name)] = content.resolve_weights(player.get('attacks', []), content.attack_ids, f"Player character '{name}'", 'attack')
+
+        #COMMENT Quest triggers, indexed by what sets them off so an event only ever reaches the quests waiting on it
+        #NOTE Compiled last so loot from every environment counts as an item that can be obtained
+        subjects = {'enemy_defeated': set(content.enemy_names), 'npc_talked': section('characters'), 'item_obtained': content.item_ids}
+        for name, quest in section('quests').items():
+            triggers = quest.get('triggers', []) if isinstance(quest, dict) else []
+            for trigger in triggers:
+                trigger = trigger if isinstance(trigger, dict) else {}
+                event, subject, status = trigger.get('event'), trigger.get('subject'), trigger.get('status', 'Complete')
+                if event not in GameContent.EVENTS:
+                    content.problem(GameContent.ERROR, f"Quest '{name}' has a trigger for event {event!r}, pick from {', '.join(GameContent.EVENTS)}.")
+                    continue
+                if subject not in subjects[event]:
+                    content.problem(GameContent.WARNING, f"Quest '{name}' waits on {event} '{subject}', which is not in the game data.")
+                content.quest_triggers.setdefault((event, text(subject)), []).append((text(name), text(status)))
+        content.quest_triggers = {key: tuple(triggers) for key, triggers in content.quest_triggers.items()}
+
+        content.attack_names, content.attack_descriptions = tuple(content.attack_names), tuple(content.attack_descriptions)
+        content.enemy_names, content.enemy_descriptions = tuple(content.enemy_names), tuple(content.enemy_descriptions)
+        content.enemy_attacks, content.item_names = tuple(content.enemy_attacks), tuple(content.item_names)
+        content.item_types = tuple(content.item_types)
+        content.environment_names = tuple(content.environment_names)
+        content.environment_enemies, content.environment_loot = tuple(content.environment_enemies), tuple(content.environment_loot)
+        return content
+
+    def tables(self):
+        #COMMENT The compiled tables as a plain dict, for storing in the compiled cache
+        #NOTE Samplers are stored as their plain tables too, pickling them would tie the cache to the module that wrote it
+        tables = dict(vars(self))
+        for field in GameContent.SAMPLER_LISTS:
+            tables[field] = tuple(sampler.tables() for sampler in tables[field])
+        tables['player_attacks'] = {name: sampler.tables() for name, sampler in tables['player_attacks'].items()}
+        return tables
+
+    @classmethod
+    def from_tables(cls, tables):
+        #COMMENT Rebuilds compiled content from tables(), without compiling again
+        content = cls.__new__(cls)
+        content.__dict__.update(tables)
+        for field in GameContent.SAMPLER_LISTS:
+            setattr(content, field, tuple(GameSampler.from_tables(sampler) for sampler in tables[field]))
+        content.player_attacks = {name: GameSampler.from_tables(sampler) for name, sampler in tables['player_attacks'].items()}
+        return content
+
+    def resolve_weights(self, entries, ids, owner, kind):
+        #COMMENT Turns a list or dict of weights into a GameSampler of IDs (or names, if ids is None), reporting what it leaves out
+        return GameSampler.build(entries, ids, lambda level, message: self.problem(level, f"{owner} {message}."), kind)
+
+    def intern_item(self, name, listed, item_type='', value=0):
+        #COMMENT Returns the ID for an item name, giving it the next free ID if it is new
+        item_id = self.item_ids.get(name)
+        if item_id is None:
+            item_id = self.item_ids[name] = len(self.item_names)
+            self.item_names.append(name)
+            self.item_listed.append(1 if listed else 0)
+            self.item_types.append(item_type)
+            self.item_values.append(value)
+        return item_id
+
+    def problem(self, level, message):
+        self.problems.append((level, message))
+
+    def errors(self):
+        #COMMENT Problems that would break the game at runtime
+        return [message for level, message in self.problems if level == GameContent.ERROR]
+
+    def warnings(self):
+        #COMMENT Problems the game can run with, but that are probably mistakes
+        return [message for level, message in self.problems if level == GameContent.WARNING]
+
+
+class GameWorld:
+    #COMMENT Spatial index of the map, built once from the environments and characters in the game data.
+    #NOTE The grid is a flat array of environment IDs sized from the data (EMPTY for uncharted tiles), so looking
+    #NOTE up a tile, a location by name or the NPC standing somewhere is one index or dict hit however big the map gets.
+    #NOTE Routes between environments are worked out here too, see build_routes.
+    EMPTY = -1
+    #COMMENT Maps with more environments than this don't get route tables, they grow with the square of the environment count
+    ROUTE_LIMIT = 1024
+
+    def __init__(self):
+        #COMMENT Grid size, width is the x extent and height is the y extent
+        self.width = 0
+        self.height = 0
+        #COMMENT Environment ID for each tile, row by row (index = y * width + x)
+        self.tiles = array('q')
+        #COMMENT Environment name to its (x, y) grid location
+        self.coordinates = {}
+        #COMMENT (x, y) grid location to the name of the character standing there
+        self.npc_tiles = {}
+        #COMMENT Environment ID to the IDs one step away, the charted tiles next to it (N, S, E, W) then anything it links to
+        #NOTE Only environments that can be stood on are in here, ones that lost their tile to another environment aren't
+        self.adjacent = {}
+        #COMMENT Route tables, row by row for each environment ID (index = from * routed + to), see build_routes
+        #NOTE routed is the number of environment IDs the tables cover, 0 if the map was too big to build them
+        self.routed = 0
+        self.next_hop = array('i')
+        self.distance = array('i')
+
+    @classmethod
+    def build(cls, data, content):
+        #COMMENT Lays the environments out on a grid just big enough to hold them all
+        world = cls()
+        locations = {}
+        for name, env in GameWorld.section(data, 'environments').items():
+            location = GameWorld.location(env)
+            if location is None:
+                content.problem(GameContent.ERROR, f"Environment '{name}' has an invalid gridLocation {env.get('gridLocation')}.")
+                continue
+            locations[name] = location
+        world.width = max((x for x, y in locations.values()), default=-1) + 1
+        world.height = max((y for x, y in locations.values()), default=-1) + 1
+        world.tiles = array('q', [GameWorld.EMPTY]) * (world.width * world.height)
+        for name, (x, y) in locations.items():
+            index = world.index(x, y)
+            if world.tiles[index] != GameWorld.EMPTY:
+                #NOTE The later environment wins, same as the old grid dictionary did
+                content.problem(GameContent.WARNING, f"Environments '{content.environment_names[world.tiles[index]]}' and '{name}' share gridLocation [{x}, {y}], only '{name}' can be reached.")
+            world.tiles[index] = content.environment_ids[name]
+            world.coordinates[name] = (x, y)
+
+        for name, character in GameWorld.section(data, 'characters').items():
+            location = GameWorld.location(character)
+            if location is None:
+                content.problem(GameContent.ERROR, f"Character '{name}' has an invalid gridLocation {character.get('gridLocation')}.")
+                continue
+            #NOTE Only the first character on a tile can be talked to, same as the old linear search
+            if location in world.npc_tiles:
+                content.problem(GameContent.WARNING, f"Characters '{world.npc_tiles[location]}' and '{name}' share gridLocation {list(location)}, only '{world.npc_tiles[location]}' can be talked to.")
+                continue
+            world.npc_tiles[location] = name
+
+        world.build_adjacent(data, content)
+        world.build_routes(len(content.environment_names))
+        return world
+
+    def build_adjacent(self, data, content):
+        #COMMENT Works out which environments are one step from each other, for routes
+        #NOTE An environment can list others in 'links' (like teleportation circles), a link works both ways
+        for environment_id in self.tiles:
+            if environment_id != GameWorld.EMPTY:
+                self.adjacent[environment_id] = []
+        for environment_id, neighbours in self.adjacent.items():
+            x, y = self.coordinates[content.environment_names[environment_id]]
+            for neighbour_x, neighbour_y in ((x, y - 1), (x, y + 1), (x + 1, y), (x - 1, y)):
+                neighbour = self.environment_at(neighbour_x, neighbour_y)
+                if neighbour is not None:
+                    neighbours.append(neighbour)
+        for name, env in GameWorld.section(data, 'environments').items():
+            links = env.get('links', []) if isinstance(env, dict) else []
+            if not isinstance(links, list):
+                content.problem(GameContent.ERROR, f"Environment '{name}' has invalid links {links!r}, it should be a list of environment names.")
+                continue
+            for link in links:
+                if link not in content.environment_ids:
+                    content.problem(GameContent.ERROR, f"Environment '{name}' links to '{link}', which does not exist.")
+                    continue
+                ends = (content.environment_ids[name], content.environment_ids[link])
+                if not all(end in self.adjacent for end in ends):
+                    content.problem(GameContent.WARNING, f"Environment '{name}' links to '{link}', but they aren't both on the map, the link can't be used.")
+                    continue
+                for start, end in (ends, ends[::-1]):
+                    if end not in self.adjacent[start]:
+                        self.adjacent[start].append(end)
+        self.adjacent = {environment_id: tuple(neighbours) for environment_id, neighbours in self.adjacent.items()}
+
+    def build_routes(self, count):
+        #COMMENT Precomputes the shortest route between every pair of environments, a breadth first search from each one
+        #NOTE next_hop holds the first step from one environment towards another and distance how many steps it is,
+        #NOTE both EMPTY if there is no way there. Following next_hop walks a route in one lookup per step.
+        if count > GameWorld.ROUTE_LIMIT:
+            return
+        self.routed = count
+        self.next_hop = array('i', [GameWorld.EMPTY]) * (count * count)
+        self.distance = array('i', [GameWorld.EMPTY]) * (count * count)
+        next_hop, distance, adjacent = self.next_hop, self.distance, self.adjacent
+        for source in adjacent:
+            row = source * count
+            next_hop[row + source] = source
+            distance[row + source] = 0
+            frontier = [source]
+            steps = 0
+            while frontier:
+                steps += 1
+                following = []
+                for place in frontier:
+                    #NOTE Everything reached through place starts the same way place does, unless place is the first step itself
+                    first = next_hop[row + place]
+                    for neighbour in adjacent[place]:
+                        if distance[row + neighbour] == GameWorld.EMPTY:
+                            distance[row + neighbour] = steps
+                            next_hop[row + neighbour] = neighbour if place == source else first
+                            following.append(neighbour)
+                frontier = following
+
+    @staticmethod
+    def section(data, name):
+        value = data.get(name, {})
+        return value if isinstance(value, dict) else {}
+
+    @staticmethod
+    def location(entry):
+        #COMMENT Reads an entry's gridLocation as an (x, y) tuple, None if it is missing or not two whole numbers 0 or over
+        location = entry.get('gridLocation') if isinstance(entry, dict) else None
+        if not isinstance(location, (list, tuple)) or len(location) != 2:
+            return None
+        if not all(isinstance(value, int) and not isinstance(value, bool) and value >= 0 for value in location):
+            return None
+        return tuple(location)
+
+    def tables(self):
+        #COMMENT The index as a plain dict, for storing in the compiled cache
+        return dict(vars(self))
+
+    @classmethod
+    def from_tables(cls, tables):
+        #COMMENT Rebuilds the index from tables(), without building it again
+        world = cls.__new__(cls)
+        world.__dict__.update(tables)
+        return world
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def index(self, x, y):
+        #COMMENT Position of a tile in the tiles array
+        return y * self.width + x
+
+    def environment_at(self, x, y):
+        #COMMENT Environment ID at a grid location, None if it is off the map or uncharted
+        if not self.in_bounds(x, y):
+            return None
+        environment_id = self.tiles[self.index(x, y)]
+        return None if environment_id == GameWorld.EMPTY else environment_id
+
+    def route(self, source, target):
+        #COMMENT Environment IDs stepped through going from source to target along a shortest route, ending with target
+        #COMMENT Empty if they are the same place, None if there is no way there
+        #NOTE One table lookup per step, maps too big for the tables search for the route instead
+        if source not in self.adjacent or target not in self.adjacent:
+            return None
+        if not self.routed:
+            found = self.search(source)
+            if target not in found:
+                return None
+            route = []
+            while target != source:
+                route.append(target)
+                target = found[target][1]
+            return route[::-1]
+        if self.distance[source * self.routed + target] == GameWorld.EMPTY:
+            return None
+        route = []
+        while source != target:
+            source = self.next_hop[source * self.routed + target]
+            route.append(source)
+        return route
+
+    def reachable(self, source):
+        #COMMENT Environment ID to the number of steps it is from source, for everywhere that can be reached from it
+        if source not in self.adjacent:
+            return {}
+        if not self.routed:
+            return {place: steps for place, (steps, _) in self.search(source).items()}
+        row = source * self.routed
+        return {place: self.distance[row + place] for place in self.adjacent if self.distance[row + place] != GameWorld.EMPTY}
+
+    def search(self, source):
+        #COMMENT Breadth first search from source, for maps without route tables
+        #COMMENT Returns environment ID to (steps, the ID it was reached from) for everywhere that can be reached
+        found = {source: (0, None)}
+        frontier = [source]
+        while frontier:
+            following = []
+            for place in frontier:
+                steps = found[place][0] + 1
+                for neighbour in self.adjacent[place]:
+                    if neighbour not in found:
+                        found[neighbour] = (steps, place)
+                        following.append(neighbour)
+            frontier = following
+        return found
+
+
+class GameWorldPack:
+    #COMMENT Read-only world pack, the environments of a map split into square chunks in one file.
+    #NOTE Layout is MAGIC, version, header length, a JSON header (map and chunk size), an index of
+    #NOTE (offset, length) for every chunk row by row, then each chunk's environments as a JSON object.
+    #NOTE The file is memory mapped and chunks are only decoded when asked for, so one open pack can be
+    #NOTE shared by every session and each session only holds the chunks it has visited (see EnvironmentManager).
+    MAGIC = b'JDDW'
+    VERSION = 1
+    SUFFIX = '.jddpack'
+    PREFIX = struct.Struct('<4sHI')
+    INDEX_ENTRY = struct.Struct('<QQ')
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with open(filepath, 'rb') as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, header_length = GameWorldPack.PREFIX.unpack_from(self.map, 0)
+            if magic != GameWorldPack.MAGIC or version != GameWorldPack.VERSION:
+                raise ValueError(f"{filepath} is not a version {GameWorldPack.VERSION} world pack.")
+            header = GameUtils.decode_json(self.map[GameWorldPack.PREFIX.size:GameWorldPack.PREFIX.size + header_length])
+        except (struct.error, ValueError):
+            self.map.close()
+            raise
+        self.width = header['width']
+        self.height = header['height']
+        self.chunk_size = header['chunk_size']
+        self.chunks_x = -(-self.width // self.chunk_size)
+        self.chunks_y = -(-self.height // self.chunk_size)
+        self.index_offset = GameWorldPack.PREFIX.size + header_length
+
+    @classmethod
+    def write(cls, environments, filepath, chunk_size=16):
+        #COMMENT Packs a dictionary of environments (the environments section of a GameData file) into filepath
+        #NOTE Environments without a valid gridLocation are left out, run --check on the source file to find them
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be 1 or more, got {chunk_size}")
+        chunks = {}
+        width = height = 0
+        for name, env in environments.items():
+            location = GameWorld.location(env)
+            if location is None:
+                print(f"Skipping environment '{name}', it has an invalid gridLocation.")
+                continue
+            x, y = location
+            width, height = max(width, x + 1), max(height, y + 1)
+            chunks.setdefault((x // chunk_size, y // chunk_size), {})[name] = env
+        header = GameUtils.encode_json({'width': width, 'height': height, 'chunk_size': chunk_size})
+        chunks_x, chunks_y = -(-width // chunk_size), -(-height // chunk_size)
+        offset = cls.PREFIX.size + len(header) + cls.INDEX_ENTRY.size * chunks_x * chunks_y
+        #COMMENT Same temp file and swap as the compiled cache, so a half written pack is never opened
+        temp_path = f"{filepath}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(cls.PREFIX.pack(cls.MAGIC, cls.VERSION, len(header)))
+                file.write(header)
+                payloads = []
+                for chunk_y in range(chunks_y):
+                    for chunk_x in range(chunks_x):
+                        chunk = chunks.get((chunk_x, chunk_y))
+                        payload = GameUtils.encode_json(chunk) if chunk else b''
+                        file.write(cls.INDEX_ENTRY.pack(offset, len(payload)))
+                        offset += len(payload)
+                        payloads.append(payload)
+                for payload in payloads:
+                    file.write(payload)
+            os.replace(temp_path, filepath)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        return len(chunks)
+
+    def chunk_of(self, x, y):
+        #COMMENT Chunk coordinates of a grid location
+        return x // self.chunk_size, y // self.chunk_size
+
+    def has_chunk(self, chunk_x, chunk_y):
+        return 0 <= chunk_x < self.chunks_x and 0 <= chunk_y < self.chunks_y
+
+    def read_chunk(self, chunk_x, chunk_y):
+        #COMMENT Decodes one chunk into a dictionary of environment name to raw environment data, empty if there is nothing there
+        if not self.has_chunk(chunk_x, chunk_y):
+            return {}
+        entry = self.index_offset + (chunk_y * self.chunks_x + chunk_x) * GameWorldPack.INDEX_ENTRY.size
+        offset, length = GameWorldPack.INDEX_ENTRY.unpack_from(self.map, entry)
+        if length == 0:
+            return {}
+        with GameUtils.gc_paused():
+            return GameUtils.decode_json(self.map[offset:offset + length])
+
+    def close(self):
+        self.map.close()
+
+
+class GameSave:
+    #COMMENT Compact binary snapshot of everything about a session that isn't in the game data.
+    #NOTE Attacks and items are stored as their compiled content IDs, with a fingerprint of the content so a save
+    #NOTE is never loaded against game data whose IDs mean something else. Anything without an ID (loot from a
+    #NOTE world pack, quests) is stored as text. Layout, all little endian:
+    #NOTE     MAGIC, version, content fingerprint
+    #NOTE     x, y, health, quests completed, princess defeated
+    #NOTE     attacks (count then an ID each, -1 means a text name follows)
+    #NOTE     inventory (count then an ID each the same way, each followed by how many of it there are)
+    #NOTE     quest log, NPC talk counters, NPC times spoken (count then a text name and a value each)
+    #NOTE Version 1 saves stored the inventory like the attacks, an ID for every item held, they still load.
+    MAGIC = b'JDDS'
+    VERSION = 2
+    READABLE_VERSIONS = (1, 2)
+    SUFFIX = '.jddsave'
+    HEADER = struct.Struct('<4sH8s')
+    STATE = struct.Struct('<iiiH?')
+    COUNT = struct.Struct('<I')
+    ID = struct.Struct('<i')
+    TEXT_ID = -1
+
+    @staticmethod
+    def fingerprint(content):
+        #COMMENT Hash of the ID tables a save refers to
+        names = '\0'.join(content.attack_names) + '\1' + '\0'.join(content.item_names)
+        return hashlib.blake2b(names.encode('utf-8'), digest_size=8).digest()
+
+    @classmethod
+    def dumps(cls, game_state):
+        #COMMENT Snapshots a game state to bytes
+        content = game_state.game_data.content
+        player = game_state.player_manager
+        npc_manager = game_state.npc_manager
+        out = bytearray(cls.HEADER.pack(cls.MAGIC, cls.VERSION, cls.fingerprint(content)))
+        x, y = game_state.player_position
+        out += cls.STATE.pack(x, y, player.health, player.quests_complete, game_state.princess_defeated)
+        cls.write_ids(out, player.attacks, content.attack_ids)
+        cls.write_counted_ids(out, game_state.inventory_manager.contents(), content.item_ids)
+        cls.write_pairs(out, player.quest_log.items(), cls.write_text)
+        cls.write_pairs(out, ((name, getattr(npc_manager, name)) for name in npc_manager.TALK_COUNTERS), cls.write_count)
+        cls.write_pairs(out, ((name, npc.times_spoken) for name, npc in npc_manager.npcs.items()), cls.write_count)
+        return bytes(out)
+
+    @classmethod
+    def loads(cls, game_state, raw):
+        #COMMENT Restores a snapshot from dumps() into a game state
+        #NOTE The whole snapshot is read before anything is changed, so a bad save leaves the game state alone
+        content = game_state.game_data.content
+        reader = GameSave.Reader(raw)
+        try:
+            magic, version, fingerprint = reader.unpack(cls.HEADER)
+            if magic != cls.MAGIC:
+                raise ValueError("This is not a JDDGame save file.")
+            if version not in cls.READABLE_VERSIONS:
+                raise ValueError(f"Save file version {version} can't be loaded by this version of the game.")
+            if fingerprint != cls.fingerprint(content):
+                raise ValueError("This save was made with different game data.")
+            x, y, health, quests_complete, princess_defeated = reader.unpack(cls.STATE)
+            attacks = reader.ids(content.attack_names)
+            if version == 1:
+                inventory = [(name, 1) for name in reader.ids(content.item_names)]
+            else:
+                inventory = reader.counted_ids(content.item_names)
+            quest_log = dict(reader.pairs(reader.text))
+            talk_counters = dict(reader.pairs(reader.count))
+            times_spoken = dict(reader.pairs(reader.count))
+        except (struct.error, UnicodeDecodeError, IndexError) as error:
+            raise ValueError(f"Save file is damaged ({error}).") from None
+
+        game_state.current_state = GameState.EXPLORING
+        game_state.princess_defeated = princess_defeated
+        player = game_state.player_manager
+        player.health = health
+        player.quests_complete = quests_complete
+        player.attacks = attacks
+        player.quest_log = quest_log
+        npc_manager = game_state.npc_manager
+        for name, value in talk_counters.items():
+            if name in npc_manager.TALK_COUNTERS:
+                setattr(npc_manager, name, value)
+        for name, value in times_spoken.items():
+            if name in npc_manager.npcs:
+                npc_manager.npcs[name].times_spoken = value
+        inventory_manager = game_state.inventory_manager
+        inventory_manager.clear()
+        for name, count in inventory:
+            inventory_manager.store(name, count)
+        inventory_manager.changed()
+        game_state.player_position = [x, y]
+        game_state.environment_manager.current_location = game_state.player_position
+        game_state.environment_manager.update_environment()
+
+    @classmethod
+    def save(cls, game_state, filepath):
+        #COMMENT Writes a snapshot to filepath, swapping it in whole so a crash mid save never ruins the last one
+        temp_path = f"{filepath}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'wb') as file:
+                file.write(cls.dumps(game_state))
+            os.replace(temp_path, filepath)
+        except OSError:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, game_state, filepath):
+        #COMMENT Reads a snapshot from filepath into a game state, raises OSError or ValueError if it can't
+        with open(filepath, 'rb') as file:
+            cls.loads(game_state, file.read())
+
+    @classmethod
+    def write_count(cls, out, value):
+        out += cls.COUNT.pack(value)
+
+    @classmethod
+    def write_text(cls, out, value):
+        encoded = str(value).encode('utf-8')
+        cls.write_count(out, len(encoded))
+        out += encoded
+
+    @classmethod
+    def write_ids(cls, out, names, ids):
+        #COMMENT Writes a list of names as their IDs, falling back to the name itself for anything without one
+        cls.write_count(out, len(names))
+        for name in names:
+            cls.write_id(out, name, ids)
+
+    @classmethod
+    def write_counted_ids(cls, out, counts, ids):
+        #COMMENT Writes a dictionary of name to count, each name as its ID (or text) followed by its count
+        cls.write_count(out, len(counts))
+        for name, count in counts.items():
+            cls.write_id(out, name, ids)
+            cls.write_count(out, count)
+
+    @classmethod
+    def write_id(cls, out, name, ids):
+        entity_id = ids.get(name)
+        if entity_id is None:
+            out += cls.ID.pack(cls.TEXT_ID)
+            cls.write_text(out, name)
+        else:
+            out += cls.ID.pack(entity_id)
+
+    @classmethod
+    def write_pairs(cls, out, pairs, write_value):
+        pairs = list(pairs)
+        cls.write_count(out, len(pairs))
+        for name, value in pairs:
+            cls.write_text(out, name)
+            write_value(out, value)
+
+    class Reader:
+        #COMMENT Reads the fields written by GameSave back out of a snapshot, in order
+        def __init__(self, raw):
+            self.raw = memoryview(raw)
+            self.offset = 0
+
+        def unpack(self, layout):
+            values = layout.unpack_from(self.raw, self.offset)
+            self.offset += layout.size
+            return values
+
+        def count(self):
+            return self.unpack(GameSave.COUNT)[0]
+
+        def text(self):
+            length = self.count()
+            if self.offset + length > len(self.raw):
+                raise IndexError("text runs past the end of the file")
+            value = str(self.raw[self.offset:self.offset + length], 'utf-8')
+            self.offset += length
+            return value
+
+        def ids(self, names):
+            #COMMENT Reads a list written by write_ids, turning IDs back into names
+            return [self.id(names) for _ in range(self.count())]
+
+        def counted_ids(self, names):
+            #COMMENT Reads (name, count) pairs written by write_counted_ids
+            return [(self.id(names), self.count()) for _ in range(self.count())]
+
+        def id(self, names):
+            entity_id = self.unpack(GameSave.ID)[0]
+            if entity_id == GameSave.TEXT_ID:
+                return self.text()
+            if 0 <= entity_id < len(names):
+                return names[entity_id]
+            raise IndexError(f"unknown ID {entity_id}")
+
+        def pairs(self, read_value):
+            return [(self.text(), read_value()) for _ in range(self.count())]
+
+
 class GameState: 
     EXPLORING = "exploring"
     IN_COMBAT = "in_combat"
     princess_defeated = False
-    def __init__(self, filepath):
-        #COMMENT Game state initialization, setting the playing grid and loading game managers
+    def __init__(self, filepath, game_data=None, time_scale=None, io=None, world_pack=None, save_path=None, seed=None,
+                 metrics=None):
+        #COMMENT Game state initialization, setting the playing grid. The game managers are made when first used, see below
+        #NOTE game_data can be passed in so several game states share one parsed copy of the GameData file
+        #NOTE time_scale speeds up or skips the game's pauses, see GamePacer
+        #NOTE io is the JDDMenuIO the menus read and write through, the console if not given
+        #NOTE world_pack is an open GameWorldPack to stream the map from instead of the GameData file's environments
+        #NOTE save_path is where Save Game and Load Game keep the save file, see GameSave
+        #NOTE seed makes every random thing in the session repeatable, a random one is picked if not given, see GameRandom
+        #NOTE metrics is a GameMetrics to time the session's actions with, None (the default) doesn't time anything
         self.current_state = GameState.EXPLORING
-        self.grid_width = 9
-        self.grid_height = 5
+        self.rng = GameRandom(seed)
+        self.metrics = metrics
+        #COMMENT Streams and renderer for this session's menus
+        self.io = io if io is not None else JDDMenuIO()
+        self.screen = JDDRenderer(stream=self.io)
+        #COMMENT Pauses wait on the session's input, so the player can skip them
+        self.pacer = GamePacer(time_scale, wait=self.io.wait)
         self.player_position = [0, 0]
+        #COMMENT Bumped whenever something menus are built from changes (items, quests), GameUI rebuilds its menus when it moves
+        self.menu_epoch = 0
         self.filepath = filepath
-        self.environment_manager = self.EnvironmentManager(filepath, self)
-        self.player_manager = self.PlayerManager(filepath, self)
-        self.inventory_manager = self.InventoryManager(inventory=[])
-        self.npc_manager = self.NPCManager(self, filepath)
-        self.combat_manager = self.CombatManager(self, filepath)
+        self.game_data = game_data if game_data is not None else GameData.load(filepath)
+        self.world_pack = world_pack
+        self.save_path = save_path if save_path is not None else os.environ.get('JDDGAME_SAVE', 'JDDGame' + GameSave.SUFFIX)
+        #COMMENT The playing grid is sized from the map, either the world pack or the one in the game data
+        map_source = self.world_pack if self.world_pack is not None else self.game_data.world
+        self.grid_width = map_source.width
+        self.grid_height = map_source.height
+
+    #COMMENT The managers are each made the first time something uses them, so the main menu shows up straight away and
+    #COMMENT a session that quits from it never builds any. The NPC roster and combat tables wait until the player
+    #COMMENT actually meets someone or searches.
+    #NOTE cached_property keeps the manager on the game state once made, after that it is a plain attribute lookup
+    @functools.cached_property
+    def environment_manager(self):
+        return self.started('environment', self.EnvironmentManager(self.game_data, self))
+
+    @functools.cached_property
+    def player_manager(self):
+        return self.started('player', self.PlayerManager(self.game_data, self))
+
+    @functools.cached_property
+    def inventory_manager(self):
+        return self.started('inventory', self.InventoryManager(inventory=[], game_state=self))
+
+    @functools.cached_property
+    def npc_manager(self):
+        return self.started('npc', self.NPCManager(self, self.game_data))
+
+    @functools.cached_property
+    def combat_manager(self):
+        return self.started('combat', self.CombatManager(self, self.game_data))
+
+    @functools.cached_property
+    def quest_manager(self):
+        return self.started('quest', self.QuestManager(self, self.game_data))
+
+    def started(self, part, manager):
+        #COMMENT Sets up a manager that was just made, timing its methods if the session has metrics
+        if self.metrics is not None:
+            self.metrics.instrument_part(part, manager, self)
+        return manager
 
     class EnvironmentManager:
-        def __init__(self, filepath, game_state):
+        #COMMENT Chunks of a world pack kept in memory per session, enough for the 3x3 around the player plus a trail behind them
+        CHUNK_CACHE_SIZE = 25
+        #COMMENT What lookup() returns for a tile with nothing on it: (environment ID, name, environment data, enemies, loot)
+        UNCHARTED = (None, "", MappingProxyType({}), GameSampler(), GameSampler())
+
+        def __init__(self, game_data, game_state):
             self.game_state = game_state
-            self.data = GameUtils.load_data(filepath)
-            #COMMENT Ensure environments data exists and is correctly formatted
-            if 'environments' not in self.data or not isinstance(self.data['environments'], dict):
-                print("Environments data is missing or corrupt.")
-                self.data['environments'] = {}
-            #COMMENT Map grid locations to environment names
-            self.environments_tuple = {tuple(env['gridLocation']): key for key, env in self.data['environments'].items()}
-            self.current_location = [0, 0]  # Initial sync of locations with player_position
-            self.update_environment()
+            self.game_data = game_data
+            #COMMENT Spatial index of the map, prebuilt by GameData
+            self.world = self.game_data.world
+            #COMMENT Streamed map, when the session was started with a world pack
+            self.world_pack = game_state.world_pack
+            #COMMENT Loaded world pack chunks, least recently used first
+            self.chunks = OrderedDict()
+            #NOTE Made on first use, which may be after the player has moved, so it starts wherever the player is
+            self.current_location = game_state.player_position  # Initial sync of locations with player_position
+            self.locate()
 
         def update_environment(self):
             #COMMENT Update the current environment based on player location
-            location_tuple = tuple(self.current_location)
-            self.environment_name = self.environments_tuple.get(location_tuple, "")
-            #COMMENT Safely access the environment data
-            self.current_environment = self.data['environments'].get(self.environment_name, {})
+            self.locate()
+            if self.world_pack is not None:
+                #COMMENT Load the chunks around the player ahead of time so the next move doesn't have to wait on one
+                self.load_chunks_around(self.current_location)
             if self.current_environment:
                 print(f"Current Location: {self.environment_name}")
             else:
                 print("This area of the map is uncharted.")
 
+        def locate(self):
+            #COMMENT Looks up the environment at the current location, without saying anything about it
+            #NOTE Only the chunk the location is in is loaded, update_environment loads the ones around it
+            (self.environment_id, self.environment_name, self.current_environment,
+             self.current_enemies, self.current_loot) = self.lookup(self.current_location)
+
         def examine_area(self):
             #COMMENT Print searchable information if available
             if self.current_environment:
@@ -143,13 +1258,13 @@ class GameState:
         def search_area(self):
             #COMMENT Searches the current environment for enemies or loot, engaging in combat or updating inventory
             if self.current_environment:
-                has_enemies = 'enemies' in self.current_environment and self.current_environment['enemies']
-                has_loot = 'lootPool' in self.current_environment and self.current_environment['lootPool']
+                has_enemies = len(self.current_enemies) > 0
+                has_loot = len(self.current_loot) > 0
                 if has_enemies or has_loot:
-                    if has_enemies and (not has_loot or random.choice(['enemy', 'loot']) == 'enemy'):
+                    if has_enemies and (not has_loot or self.game_state.rng.exploration.choice(['enemy', 'loot']) == 'enemy'):
                         return "enemy_encounter"
                     elif has_loot:
-                        item = random.choice(self.current_environment['lootPool'])
+                        item = self.current_loot.draw(self.game_state.rng.exploration)
                         self.game_state.inventory_manager.add_item(item)
                         return "item_found", item
                 else:
@@ -157,10 +1272,56 @@ class GameState:
             else:
                 print("No environment found at the specified location.")
 
+        def lookup(self, location):
+            #COMMENT Returns (environment ID, name, environment data, enemies, loot) for a grid location
+            #NOTE enemies is a GameSampler of enemy IDs and loot one of item names
+            #NOTE Environments streamed from a world pack have no ID, they aren't part of the compiled content
+            if self.world_pack is not None:
+                return self.load_chunk(*self.world_pack.chunk_of(*location)).get(tuple(location), self.UNCHARTED)
+            environment_id = self.world.environment_at(*location)
+            if environment_id is None:
+                return self.UNCHARTED
+            content = self.game_data.content
+            environment_name = content.environment_names[environment_id]
+            return (environment_id, environment_name, self.game_data.environments.get(environment_name, {}),
+                    content.environment_enemies[environment_id], content.environment_loot[environment_id])
+
+        def load_chunk(self, chunk_x, chunk_y):
+            #COMMENT Returns a chunk of the world pack as a dictionary of (x, y) to lookup() results, loading it if needed
+            key = (chunk_x, chunk_y)
+            chunk = self.chunks.get(key)
+            if chunk is not None:
+                self.chunks.move_to_end(key)
+                return chunk
+            chunk = {}
+            enemy_ids = self.game_data.content.enemy_ids
+            for name, env in self.world_pack.read_chunk(chunk_x, chunk_y).items():
+                location = GameWorld.location(env)
+                if location is not None:
+                    #NOTE Enemies are looked up by name here, packs don't depend on the IDs of the content they were built with
+                    enemies = GameSampler.build(env.get('enemies', ()), enemy_ids)
+                    loot = GameSampler.build(env.get('lootPool', ()))
+                    #NOTE Wrapped instead of frozen so a chunk costs nothing but its decode until a field is actually read
+                    chunk[location] = (None, name, GameDataSection(env), enemies, loot)
+            self.chunks[key] = chunk
+            #COMMENT Forget the chunks that haven't been near the player for the longest
+            while len(self.chunks) > self.CHUNK_CACHE_SIZE:
+                self.chunks.popitem(last=False)
+            return chunk
+
+        def load_chunks_around(self, location):
+            #COMMENT Loads the chunk a location is in and the eight around it
+            chunk_x, chunk_y = self.world_pack.chunk_of(*location)
+            for neighbour_y in (chunk_y - 1, chunk_y, chunk_y + 1):
+                for neighbour_x in (chunk_x - 1, chunk_x, chunk_x + 1):
+                    if self.world_pack.has_chunk(neighbour_x, neighbour_y):
+                        self.load_chunk(neighbour_x, neighbour_y)
+            #NOTE The player's own chunk goes last so it is the most recently used
+            self.load_chunk(chunk_x, chunk_y)
+
         def get_current_location(self):
             #COMMENT Ensure current location is updated each time method is called
-            location_tuple = tuple(self.current_location)
-            environment_name = self.environments_tuple.get(location_tuple)
+            environment_name = self.lookup(self.current_location)[1]
             if environment_name:
                 return environment_name
             else:
@@ -170,10 +1331,10 @@ class GameState:
 
         def get_coordinates_for_location(self, location_name):
             #COMMENT Debugging function used to get coordinates for a location when given a location name
-            #COMMENT Iterate over environments to find matching location name
-            for name, env in self.data['environments'].items():
-                if name == location_name:
-                    return env['gridLocation']
+            #NOTE Only knows the environments in the game data, not ones streamed from a world pack
+            coordinates = self.world.coordinates.get(location_name)
+            if coordinates is not None:
+                return list(coordinates)
             #COMMENT If location name not found, return a message indicating invalid location
             return f"No coordinates found for the location: {location_name}"
         
@@ -184,10 +1345,10 @@ class GameState:
     class PlayerManager:
         quests_complete = 0
 
-        def __init__(self, filepath, game_state):
+        def __init__(self, game_data, game_state):
             #COMMENT Manages player health, inventory, and quests
             self.game_state = game_state
-            self.data = GameUtils.load_data(filepath)
+            self.game_data = game_data
             self.health = 100
             self.quest_log = {}
             self.attacks = ["Atomic Flame"]#["Sword Slash","Sword Slash+","Dagger Slash","Dagger Slash+","Fireball","Water Ball","Air Palm","Mean Elbow"]
@@ -198,17 +1359,10 @@ class GameState:
 
         def player_win(self, enemy_name):
             #COMMENT Updating quests based upon certain Battle Outcomes
-            if enemy_name == "Dragon":
-                self.update_quest("Slay the Dragon", "Complete")
-            elif enemy_name == "Necromancer":
-                self.update_quest("Slay the Necromancer", "Complete")
-            elif enemy_name == "Boss Bandit":
-                self.update_quest("Slay the Boss of the Bandits", "Complete")
-            elif enemy_name == "King of the Forest":
-                self.update_quest("Slay the King of the Forest", "Complete")
-            elif enemy_name == "Sandra Baylent":
-                GameState.princess_defeated = True
-                self.update_quest("Talk to Princess Sandra", "Incomplete")
+            #NOTE Which quests a win updates is set by the quest triggers in the game data, see QuestManager
+            if enemy_name == "Sandra Baylent":
+                self.game_state.princess_defeated = True  #BUGFIX Was set on the class, which leaked into every other game state
+            self.game_state.quest_manager.dispatch('enemy_defeated', enemy_name)
 
         def is_defeated(self):
             #COMMENT Check if the player's health has dropped to zero or below.
@@ -216,39 +1370,116 @@ class GameState:
 
         def update_quest(self, quest_name, status):
             #COMMENT Updates the status of a quest
+            #BUGFIX Completing a quest that was already complete (telling Sandra no twice) counted it again
+            newly_complete = status == 'Complete' and self.quest_log.get(quest_name) != 'Complete'
             self.quest_log[quest_name] = status
+            self.game_state.menu_epoch += 1
             print(f"Quest '{quest_name}' updated to {status}")
-            if status == 'Complete':
+            if newly_complete:
                 self.quests_complete += 1
-            GameEngine.respected_individual(self)
-            time.sleep(5)
+                #NOTE The ending only depends on how many quests are complete, so it is only checked when that goes up
+                GameEngine.respected_individual(self)
+            self.game_state.pacer.pause(5)
 
         def learn_attack(self, new_attack):
             #COMMENT Adds a new attack to the player's arsenal
             self.attacks.append(new_attack)
 
     class InventoryManager:
-        
-        def __init__(self, inventory):
-            #COMMENT Manages the player's inventory
-            self.inventory = inventory
+        #COMMENT The player's items as a count of each, keyed by item ID, with an index of what is held of each item type
+        #COMMENT and the total value held of each type, all kept up to date on every add and remove.
+        #NOTE Loot with no ID (from a world pack, not in the compiled content) is keyed by its name instead and has no type.
+        #NOTE Checking for an item, counting it or totalling coins costs the same however long the player has been playing.
 
-        def add_item(self, item):
+        def __init__(self, inventory=(), game_state=None):
+            #COMMENT Manages the player's inventory, starting with the item names in inventory
+            self.game_state = game_state
+            self.content = game_state.game_data.content if game_state is not None else None
+            self.clear()
+            for item in inventory:
+                self.store(item, 1)
+
+        def clear(self):
+            #COMMENT Empties the inventory
+            #NOTE counts keeps the order items were first picked up in, so listing and saving an inventory is repeatable
+            self.counts = {}
+            self.by_type = {}
+            self.value_by_type = {}
+
+        def key(self, item):
+            #COMMENT The ID for an item name, or the name itself for loot with no ID
+            if self.content is None:
+                return item
+            return self.content.item_ids.get(item, item)
+
+        def name(self, key):
+            return self.content.item_names[key] if isinstance(key, int) else key
+
+        def store(self, item, count):
+            #COMMENT Adds (or takes away, with a negative count) some of an item and updates the indexes, returns the new count
+            key = self.key(item)
+            held = self.counts.get(key, 0) + count
+            if held > 0:
+                self.counts[key] = held
+            else:
+                count -= held
+                self.counts.pop(key, None)
+            if isinstance(key, int):
+                item_type = self.content.item_types[key]
+                if item_type:
+                    if held > 0:
+                        self.by_type.setdefault(item_type, {})[key] = held
+                    else:
+                        self.by_type.get(item_type, {}).pop(key, None)
+                    self.value_by_type[item_type] = self.value_by_type.get(item_type, 0) + self.content.item_values[key] * count
+            return max(held, 0)
+
+        def add_item(self, item, count=1):
             #COMMENT Adds an item to the inventory
-            self.inventory.append(item)
+            self.store(item, count)
+            self.changed()
             print(f"Added {item} to inventory")
+            if self.game_state is not None:
+                self.game_state.quest_manager.dispatch('item_obtained', item)
 
-        def remove_item(self, item):
+        def remove_item(self, item, count=1):
             #COMMENT Removes an item from the inventory
-            if item in self.inventory:
-                self.inventory.remove(item)
+            if self.has_item(item):
+                self.store(item, -count)
+                self.changed()
                 print(f"Removed {item} from inventory")
 
+        def changed(self):
+            #COMMENT Lets the UI know menus built from the old inventory are out of date
+            if self.game_state is not None:
+                self.game_state.menu_epoch += 1
+
         def has_item(self, item):
             #COMMENT This just returns an item in the inventory if its in the inventory, I can't remember why I wrote this
             #NOTE Leaving this here in case i need it for some reason
-            return item in self.inventory
-        
+            return self.key(item) in self.counts
+
+        def count(self, item):
+            #COMMENT How many of an item the player has
+            return self.counts.get(self.key(item), 0)
+
+        def items_of_type(self, item_type):
+            #COMMENT Names and counts of the items held of one type ('money', 'equip', ...)
+            return {self.name(key): count for key, count in self.by_type.get(item_type, {}).items()}
+
+        def coin_value(self):
+            #COMMENT Total value of the money the player is carrying
+            return self.value_by_type.get('money', 0)
+
+        def contents(self):
+            #COMMENT Every item held by name, with how many of each
+            return {self.name(key): count for key, count in self.counts.items()}
+
+        @property
+        def inventory(self):
+            #COMMENT The inventory as a list of names with an entry for every item held, the way it used to be stored
+            return [self.name(key) for key, count in self.counts.items() for _ in range(count)]
+
     class NPCManager:
         #COMMENT remainders from a feature I did not get to impliment. Ran out of time.
         times_talked_osiris = 0 
@@ -256,16 +1487,19 @@ class GameState:
         times_talked_irons = 0 
         times_talked_erynn = 0 
         times_talked_james = 0 
+        #COMMENT Names of the counters above, so save files can find them
+        TALK_COUNTERS = ('times_talked_osiris', 'times_talked_princess', 'times_talked_irons', 'times_talked_erynn', 'times_talked_james')
 
-        def __init__(self, game_state, filepath):
+        def __init__(self, game_state, game_data):
             self.game_state = game_state
-            self.npcs = self.load_npcs(filepath)
-            self.filepath = filepath
+            self.game_data = game_data
+            self.npcs = self.load_npcs()
+            #COMMENT NPCs by the grid location they stand on, from the world index
+            self.npcs_by_tile = {location: self.npcs[name] for location, name in self.game_data.world.npc_tiles.items() if name in self.npcs}
             
-        def load_npcs(self,filepath):
-            #COMMENT Load NPCs from a JSON file and store them in a dictionary.
-            data = GameUtils.load_data(filepath)
-            character_data = data['characters']
+        def load_npcs(self):
+            #COMMENT Build NPCs from the characters section and store them in a dictionary.
+            character_data = self.game_data.characters
             npcs = {}
             for name, details in character_data.items():
                 #COMMENT print(details)  # Debug: Check what details contains
@@ -274,10 +1508,7 @@ class GameState:
 
         def get_npc_by_position(self, gridLocation):
             #COMMENT Return the NPC at a given position if there's any
-            for npc in self.npcs.values():
-                if npc.gridLocation == gridLocation:
-                    return npc
-            return None
+            return self.npcs_by_tile.get(tuple(gridLocation))
 
         def intro_to_npc(self, gridLocation):
             #COMMENT Facilitate interaction with an NPC based on the player's position
@@ -288,40 +1519,43 @@ class GameState:
         def interact_with_npc(self, gridLocation):
             #COMMENT Facilitate interaction with an NPC based on the player's position
             npc = self.get_npc_by_position(gridLocation)
-            speak_type = random.randint(0,3)
+            if npc:
+                self.game_state.quest_manager.dispatch('npc_talked', npc.name)
+            speak_type = self.game_state.rng.dialogue.randint(0,3)
             #COMMENT Just Speaking Random Dialogue Options to the Player specifically for sandra after fight
             if npc and npc.name == 'Sandra Baylent' and self.game_state.princess_defeated == True and speak_type != 3 and not "Talk to Princess Sandra" in self.game_state.player_manager.quest_log:
-                GameUtils.clear_screen()
+                self.game_state.screen.clear()
                 print(f">>{npc.name}: {npc.speak()}")
-                time.sleep(3.33)
-                GameUtils.clear_screen()
+                self.game_state.pacer.pause(3.33)
+                self.game_state.screen.clear()
             #COMMENT Speaking Specific quest dialogue to the player specifically for sandra after fight
             elif npc and npc.name == 'Sandra Baylent' and self.game_state.princess_defeated == True and speak_type == 3 and not "Talk to Princess Sandra" in self.game_state.player_manager.quest_log:
-                GameUtils.clear_screen()
+                self.game_state.screen.clear()
                 print(f">>{npc.name}: {npc.quest_dialogue}\n{npc.give_quest()}")
                 self.game_state.player_manager.update_quest("Talk to Princess Sandra", "Complete")
-                time.sleep(15)
-                GameUtils.clear_screen()
+                self.game_state.pacer.pause(15)
+                self.game_state.screen.clear()
             elif npc and npc.name == 'Sandra Baylent' and self.game_state.princess_defeated == True and "Run away with Princess Sandra?" in self.game_state.player_manager.quest_log:
-                GameUtils.clear_screen()
-                GameUI(game_state=self.game_state, game_engine=GameEngine(game_state=self.game_state, config_path=self.filepath),config_path=self.filepath).create_and_display_menu('sandra')
+                self.game_state.screen.clear()
+                #COMMENT Tells the menu navigator to open Sandra's menu on top of the current one
+                return JDDMenuNav.push('sandra')
             #COMMENT Specific condition for sandra for before you fight her.
             elif npc and npc.name == 'Sandra Baylent' and self.game_state.princess_defeated == False:
-                GameUtils.clear_screen()
+                self.game_state.screen.clear()
                 print(">>You're stopped by the guards before you get to the princess")
-                GameUtils.clear_screen()
+                self.game_state.screen.clear()
             #COMMENT Just Speaking Random Dialogue Options to the Player
             elif npc and speak_type != 3:
-                GameUtils.clear_screen()
+                self.game_state.screen.clear()
                 print(f">>{npc.name}: {npc.speak()}")
-                time.sleep(3.33)
-                GameUtils.clear_screen()
+                self.game_state.pacer.pause(3.33)
+                self.game_state.screen.clear()
             #COMMENT Speaking Specific quest dialogue to the player
             elif npc and speak_type == 3:
-                GameUtils.clear_screen()
+                self.game_state.screen.clear()
                 print(f">>{npc.name}: {npc.quest_dialogue}\n{npc.give_quest()}")
-                time.sleep(10)
-                GameUtils.clear_screen()
+                self.game_state.pacer.pause(10)
+                self.game_state.screen.clear()
             
 
         class NPC:
@@ -331,12 +1565,12 @@ class GameState:
                 self.dialogues = dialogues
                 self.quest_dialogue = quest_dialogue
                 self.quest = quest
-                self.gridLocation = gridLocation
+                self.gridLocation = list(gridLocation)
                 self.game_state = game_state
                 self.times_spoken = 0 
 
             def speak(self):
-                return random.choice(self.dialogues)
+                return self.game_state.rng.dialogue.choice(self.dialogues)
 
 
             def give_quest(self):
@@ -346,92 +1580,129 @@ class GameState:
                 else:
                     return f"{self.name} has no quests for you."
 
+    class QuestManager:
+        #COMMENT Passes game events (an enemy defeated, an NPC talked to, an item obtained) on to the quests waiting on them
+        #NOTE Quests declare their triggers in the quests section of the game data, for example
+        #NOTE     "Slay the Dragon": {"triggers": [{"event": "enemy_defeated", "subject": "Dragon", "status": "Complete"}]}
+        #NOTE The triggers are indexed by (event, subject) when the content is compiled, so an event is one dict lookup
+        #NOTE however many quests there are, and events no quest is waiting on cost nothing more.
+        def __init__(self, game_state, game_data):
+            self.game_state = game_state
+            self.triggers = game_data.content.quest_triggers
+
+        def dispatch(self, event, subject):
+            #COMMENT Updates every quest with a trigger for this event and subject
+            for quest_name, status in self.triggers.get((event, subject), ()):
+                current = self.game_state.player_manager.quest_log.get(quest_name)
+                #NOTE A trigger never undoes a finished quest, and firing again (the same boss beaten twice) changes nothing
+                if current == status or current == 'Complete':
+                    continue
+                self.game_state.player_manager.update_quest(quest_name, status)
+
     class CombatManager:
-        def __init__(self, game_state, filepath):
-            self.filepath = filepath
+        def __init__(self, game_state, game_data):
             self.game_state = game_state
-            self.enemies = self.load_combat_data('enemies')  # Load enemies
-            self.attacks = self.load_combat_data('attacks')  # Load attacks
+            self.game_data = game_data
+            #NOTE Enemy templates are the frozen entries from the game data, fights use Enemy instances spawned from them
+            self.enemies = self.load_combat_data('enemies')
+            self.attacks = self.load_combat_data('attacks')
             self.player_info = self.load_combat_data('playerCharacter')
             self.player_char = self.player_info['Brom Crystalind']
+            #COMMENT Combat runs on the compiled content, so attacks and enemies are looked up by ID
+            self.content = game_data.content
+            self.player_attacks = self.content.player_attacks['Brom Crystalind']
 
         def load_combat_data(self, key):
-            try:
-                with open(self.filepath, 'r') as file:
-                    data = json.load(file)
-                    return data.get(key, {})
-            except Exception as e:
-                print(f"Failed to load {key} data: {e}")
-                return {}
+            #COMMENT Pulls one section out of the shared game data
+            return self.game_data.section(key)
+
+        def spawn_enemy(self, enemy_id):
+            #COMMENT Creates a fresh Enemy for one fight from its compiled template
+            return self.Enemy(self.content, enemy_id)
 
         def choose_enemy(self):
-            current_env = self.game_state.environment_manager.current_environment
-            if not current_env or 'enemies' not in current_env:
+            enemies = self.game_state.environment_manager.current_enemies
+            if not enemies:
                 print("No enemies available in this environment.")
                 return None, None
-            enemy_name = random.choice(current_env['enemies'])
-            enemy_info = self.enemies.get(enemy_name, {})
-            if not enemy_info:
-                print(f"Enemy data for {enemy_name} not found.")
-                return None, None
-            print(f"You have encountered a {enemy_name}: {enemy_info.get('description', 'No description available.')}")
-            return enemy_name, enemy_info
+            #NOTE References were checked when the content (or world pack chunk) was loaded, so the enemy always exists
+            enemy = self.spawn_enemy(enemies.draw(self.game_state.rng.encounters))
+            print(f"You have encountered a {enemy.name}: {enemy.description}")
+            return enemy.name, enemy
 
         def get_attack_damage(self, attack_name):
-            attack = self.attacks.get(attack_name, {})
-            damage = random.randint(attack.get('damageRange', [0, 0])[0], attack.get('damageRange', [0, 0])[1])
-            return damage
+            return self.roll_damage(self.content.attack_ids[attack_name])
+
+        def roll_damage(self, attack_id):
+            #COMMENT Rolls damage for an attack by its ID
+            return self.game_state.rng.combat.randint(self.content.attack_min[attack_id], self.content.attack_max[attack_id])
 
-        def player_turn(self, enemy_info):
+        def player_turn(self, enemy):
             print("\nYour turn!")
-            player_attack = random.choice(self.player_char['attacks'])
-            damage = self.get_attack_damage(player_attack)
-            enemy_info['health'] -= damage
-            print(f">>You attack with {player_attack} ({self.attacks[player_attack]['description']}), dealing {damage} damage.")
+            attack_id = self.player_attacks.draw(self.game_state.rng.combat)
+            damage = self.roll_damage(attack_id)
+            enemy.health -= damage
+            print(f">>You attack with {self.content.attack_names[attack_id]} ({self.content.attack_descriptions[attack_id]}), dealing {damage} damage.")
 
-        def enemy_turn(self, enemy_info):
-            if enemy_info['health'] > 0:
+        def enemy_turn(self, enemy):
+            if enemy.health > 0:
                 print("\nEnemy's turn!")
-                enemy_attack = random.choice(enemy_info['attacks'])
-                damage = self.get_attack_damage(enemy_attack)
+                attack_id = enemy.attacks.draw(self.game_state.rng.combat)
+                damage = self.roll_damage(attack_id)
                 self.game_state.player_manager.update_health(-damage)
-                print(f">>The {enemy_info['name']} attacks with {enemy_attack} ({self.attacks[enemy_attack]['description']}), dealing {damage} damage.")
+                print(f">>The {enemy.name} attacks with {self.content.attack_names[attack_id]} ({self.content.attack_descriptions[attack_id]}), dealing {damage} damage.")
 
         def combat(self):
             self.game_state.current_state = GameState.IN_COMBAT
-            enemy_name, enemy_info = self.choose_enemy()
-            if not enemy_info:
+            enemy_name, enemy = self.choose_enemy()
+            if not enemy:
                 print("No enemy to fight.")
+                self.game_state.current_state = GameState.EXPLORING  #BUGFIX Was left in combat, which hid every menu
                 return
-            while self.game_state.player_manager.health > 0 and enemy_info['health'] > 0:
-                self.player_turn(enemy_info)
-                if enemy_info['health'] <= 0:
+            while self.game_state.player_manager.health > 0 and enemy.health > 0:
+                self.player_turn(enemy)
+                if enemy.health <= 0:
                     print(f">>\nYou have defeated the {enemy_name}!")
                     self.game_state.player_manager.player_win(enemy_name)
                     self.game_state.current_state = GameState.EXPLORING
                     return True
-                time.sleep(3)
-                self.enemy_turn(enemy_info)
+                self.game_state.pacer.pause(3)
+                self.enemy_turn(enemy)
                 if self.game_state.player_manager.is_defeated():
                     GameEngine.defeat(self)
                     self.game_state.current_state = GameState.EXPLORING
                     return False
-                time.sleep(3)
+                self.game_state.pacer.pause(3)
+            #BUGFIX Don't leave the game stuck in combat if the fight never started
+            self.game_state.current_state = GameState.EXPLORING
 
         def Final_combat(self):
             self.game_state.current_state = GameState.IN_COMBAT
-            final_boss = self.enemies['The End']
-            while self.game_state.player_manager.health > 0 and final_boss['health'] > 0:
+            final_boss = self.spawn_enemy(self.content.enemy_ids['The End'])
+            while self.game_state.player_manager.health > 0 and final_boss.health > 0:
                 self.player_turn(final_boss)
-                if final_boss['health'] <= 0:
+                if final_boss.health <= 0:
                     print(f"\nYou have defeated The End!\nYou Have Acheived the Hardest, Most Secret Ending!")
                     exit()
-                time.sleep(0.1)
+                self.game_state.pacer.pause(0.1)
                 self.enemy_turn(final_boss)
                 if self.game_state.player_manager.is_defeated():
                     print("\nYou have been defeated by The End!!")
-                    self.game_state.player_manager.defeat()
-                time.sleep(0.1)
+                    GameEngine.defeat(self)  #BUGFIX PlayerManager has no defeat method
+                self.game_state.pacer.pause(0.1)
+
+        class Enemy:
+            #COMMENT One enemy in one fight. Spawned from a frozen template and thrown away when the fight ends,
+            #COMMENT so beating a Goblin no longer leaves every later Goblin already dead.
+            #NOTE __slots__ keeps each one small, attacks is the GameSampler of attack IDs shared by every enemy of the same type
+            __slots__ = ('id', 'name', 'description', 'health', 'attacks')
+
+            def __init__(self, content, enemy_id):
+                self.id = enemy_id
+                self.name = content.enemy_names[enemy_id]
+                self.description = content.enemy_descriptions[enemy_id]
+                self.health = content.enemy_health[enemy_id]
+                self.attacks = content.enemy_attacks[enemy_id]
 
 class GameEngine:
     def __init__(self, game_state, config_path):
@@ -451,7 +1722,8 @@ class GameEngine:
             dx, dy = self.movements[direction]
             new_x = self.game_state.player_position[0] + dx
             new_y = self.game_state.player_position[1] + dy
-            if 0 <= new_x < self.game_state.grid_height and 0 <= new_y < self.game_state.grid_width:
+            #BUGFIX Width is the x extent and height the y extent, these used to be checked the wrong way around
+            if 0 <= new_x < self.game_state.grid_width and 0 <= new_y < self.game_state.grid_height:
                 self.game_state.player_position = [new_x, new_y]
                 self.game_state.environment_manager.current_location = self.game_state.player_position
                 self.game_state.environment_manager.update_environment()
@@ -460,6 +1732,29 @@ class GameEngine:
         else:
             print("Invalid direction!")
 
+    def travel(self, destination):
+        #COMMENT Takes the player to an environment by name along the shortest route there, in one go
+        #NOTE Routes come from the tables GameWorld builds at load, so finding one costs a lookup per step (see GameWorld.route)
+        game_data = self.game_state.game_data
+        if self.game_state.world_pack is not None:
+            #NOTE Routes only cover the map in the game data, a world pack's map is streamed and never seen whole
+            print("You can't travel on this map, move one step at a time instead.")
+            return False
+        environment_manager = self.game_state.environment_manager
+        route = game_data.world.route(environment_manager.environment_id, game_data.content.environment_ids.get(destination))
+        if route is None:
+            print(f"There is no way to get to {destination} from here.")
+            return False
+        if not route:
+            print(f"You are already at {destination}.")
+            return True
+        names = game_data.content.environment_names
+        print(f"You travel {len(route)} step{'s' if len(route) != 1 else ''}: {' -> '.join(names[place] for place in route)}")
+        self.game_state.player_position = list(game_data.world.coordinates[destination])
+        environment_manager.current_location = self.game_state.player_position
+        environment_manager.update_environment()
+        return True
+
     def spawn_player(self, spawnLocation):
         #COMMENT Spawns the player at a specified location
         print(f"!Dev Alert! Spawning at location = {spawnLocation}")
@@ -483,31 +1778,54 @@ class GameEngine:
         else:
             print(f"Action {action} not recognized.")
 
+    def save_game(self):
+        #COMMENT Saves the game to the session's save file
+        try:
+            GameSave.save(self.game_state, self.game_state.save_path)
+        except OSError as error:
+            print(f"Could not save the game: {error}")
+            return
+        print(f"Game saved to {self.game_state.save_path}")
+
+    def load_game(self):
+        #COMMENT Loads the game from the session's save file, returns True if it worked
+        try:
+            GameSave.load(self.game_state, self.game_state.save_path)
+        except FileNotFoundError:
+            print("There is no saved game to load.")
+            return False
+        except (OSError, ValueError) as error:
+            print(f"Could not load the game: {error}")
+            return False
+        print("Game loaded.")
+        return True
+
     def print_status(self):
         #COMMENT Print the current overall status of the player.
-        GameUtils.clear_screen()
+        self.game_state.screen.clear()
         self.game_state.environment_manager.update_environment()
         print(f"Health: {self.game_state.player_manager.health}")
-        print(f"Inventory: {self.game_state.inventory_manager.inventory}")
+        print(f"Inventory: {self.game_state.inventory_manager.contents()}")
+        print(f"Coins: {self.game_state.inventory_manager.coin_value()}")
         print(f"Quest Log: {self.game_state.player_manager.quest_log}")
-        time.sleep(10)
+        self.game_state.pacer.pause(10)
 
     def do_search(self):
         #COMMENT Executes the search_area function 
-        GameUtils.clear_screen()
+        self.game_state.screen.clear()
         result = self.game_state.environment_manager.search_area()
         if result == 'enemy_encounter':
             self.game_state.combat_manager.combat()
-        time.sleep(4)
-        GameUtils.clear_screen()
+        self.game_state.pacer.pause(4)
+        self.game_state.screen.clear()
 
 
     def do_examine(self):
         #COMMENT Executes the examine_area function and then the program sleeps for 6 seconds
-        GameUtils.clear_screen()
+        self.game_state.screen.clear()
         self.game_state.environment_manager.examine_area()
-        time.sleep(6)
-        GameUtils.clear_screen()
+        self.game_state.pacer.pause(6)
+        self.game_state.screen.clear()
 
     def do_pickup(self, item=None):
         #COMMENT Checks if an item is in the inventory already and if not adds it to the inventory
@@ -541,15 +1859,15 @@ class GameEngine:
         #COMMENT The Happy Wife Happy Life ending.
         self.game_state.current_state = GameState.IN_COMBAT
         print('You take the princess by the hand and leave the kingdom.')
-        time.sleep(1.5)
+        self.game_state.pacer.pause(1.5)
         print('You Adventure together for many years, together evading attempts to return the princess to the kingdom.')
-        time.sleep(1.5)
+        self.game_state.pacer.pause(1.5)
         print('Eventually you fall in love.')
-        time.sleep(1.5)
+        self.game_state.pacer.pause(1.5)
         print('You eventually work up the courage to ask her to marry you')
-        time.sleep(1.5)
+        self.game_state.pacer.pause(1.5)
         print('You Marry the Princess and Retire Happily in the Magical Forest, Satisfied with your life')
-        time.sleep(3)
+        self.game_state.pacer.pause(3)
         print("'Happy Wife Happy Life'")
         exit()
 
@@ -562,16 +1880,67 @@ class GameEngine:
     
     
 class GameUI:
-    def __init__(self, game_state, game_engine, config_path):
+    #COMMENT Items needed for the secret 'One Above All' ending
+    SECRET_ENDING_ITEMS = ('Aincent Tome', 'Aincent Sword', 'Aincent Shield')
+    #COMMENT Screen rows a travel menu uses besides its destinations (title, description, underline, more, go back, prompt, input)
+    TRAVEL_MENU_ROWS = 8
+
+    def __init__(self, game_state, game_engine, config_path, game_data=None):
         #COMMENT Manages user interface and menus
         self.game_state = game_state
         self.game_engine = game_engine
         self.config_path = config_path
+        self.game_data = game_data if game_data is not None else game_state.game_data
+        #COMMENT The handlers only depend on this GameUI, so they are built once instead of on every menu
+        self.action_handlers = self.prepare_action_handlers()
+        #NOTE Only sessions given a GameMetrics get their handlers and methods wrapped, the rest run untouched
+        if game_state.metrics is not None:
+            self.action_handlers = game_state.metrics.instrument(game_state, game_engine, self.action_handlers)
+        #COMMENT Built menus keyed by (menu name, environment name), see get_menu
+        self.menu_cache = {}
+        self.menu_epoch = game_state.menu_epoch
+        #COMMENT Page of destinations the travel menu is showing, see turn_page
+        self.menu_page = 0
 
 
     def create_and_display_menu(self, menu_name):
+        #COMMENT Displays a menu, and then every menu the player navigates to from it, from one loop
+        #NOTE Action handlers return a JDDMenuNav for the next menu instead of calling this again,
+        #NOTE so moving around never adds to the call stack no matter how long the session is.
+        return JDDMenuNavigator(self.get_menu).run(menu_name)
+
+    def get_menu(self, menu_name):
+        #COMMENT Returns a ready to display menu, building it only if it isn't cached yet
+        #NOTE The environment is part of the key so moving never needs to throw anything away. Picking up items
+        #NOTE and updating quests bump game_state.menu_epoch, which empties the cache before the next lookup.
+        #NOTE There is no screen clear here, the renderer redraws over the last menu when the menu is displayed.
+        if self.game_state.current_state != GameState.EXPLORING:
+            return  #BUGFIX Avoid displaying the menu if not exploring
+        if self.menu_epoch != self.game_state.menu_epoch:
+            self.invalidate_menus()
+        #NOTE Only paged menus (the travel menu) are cached per page
+        page = self.menu_page if self.game_data.menus.get(menu_name, {}).get('type') == 5 else 0
+        key = (menu_name, self.game_state.environment_manager.environment_name, page)
+        menu = self.menu_cache.get(key)
+        if menu is None:
+            menu = self.build_menu(menu_name)
+            if menu is None:
+                return None
+            self.menu_cache[key] = menu
+        return menu
+
+    def turn_page(self, page):
+        #COMMENT Sets which page of destinations the travel menu shows next, past the last page goes back to the first
+        self.menu_page = page
+
+    def invalidate_menus(self):
+        #COMMENT Drops every cached menu so they are rebuilt from the current game state
+        self.menu_cache.clear()
+        self.menu_epoch = self.game_state.menu_epoch
+
+    def build_menu(self, menu_name):
         """
-        Creates and displays menus based on game data and player environment
+        Creates menus based on game data and player environment
 
         Menu Types
         1 - gets it's title and description from the GameData JSON file
@@ -580,163 +1949,513 @@ class GameUI:
             - used for the main game loop 
         3 - gets it's title from the name of the environment, and it's description from the player's current location
         """
-        if self.game_state.current_state != GameState.EXPLORING:
-            return  #BUGFIX Avoid displaying the menu if not exploring
-        game_data = GameUtils.load_data(self.config_path)
+        game_data = self.game_data
+        #COMMENT Getting the current position of the player and setting the name of the corresponding location to the variable
+        #NOTE Used so that actual in game menus have their title and description set to the environment's name and description
         environment_name = self.game_state.environment_manager.get_current_location()
         if environment_name is None:
             print("Error: Current location is invalid or not found in environments.")
             return
-        if menu_name not in game_data['menus']:
+        if menu_name not in game_data.menus:
             print(f"{menu_name} not found in the menu data.")
             return None
-        menu_info = game_data['menus'][menu_name]
-        environment_info = game_data['environments'].get(environment_name, {})
+        menu_info = game_data.menus[menu_name]
+        environment_info = self.game_state.environment_manager.lookup(self.game_state.player_position)[2]
 
         if not environment_info:
             print(f"No information available for environment '{environment_name}'.")
             return
-        #COMMENT Prepare action handlers that correspond to user choices
-        action_handlers = self.prepare_action_handlers()
-        #COMMENT Getting the current position of the player and setting the name of the corresponding location to the variable
-        #NOTE Used so that actual in game menus have their title and description set to the environment's name and description
-        environment_name = self.game_state.environment_manager.get_current_location()
+        #COMMENT Action handlers that correspond to user choices
+        action_handlers = self.action_handlers
         #COMMENT Create the menu using JDDMenuBuilder
-        builder = JDDMenuBuilder()
-        menu_info = game_data['menus'][menu_name]
-        environment_info = game_data['environments'][environment_name]
+        #NOTE Menus draw through the session's renderer, which only redraws what changed since the last menu
+        builder = JDDMenuBuilder().set_renderer(self.game_state.screen).set_io(self.game_state.io)
         #NOTE This Factory is for type 1 Menus
         if menu_info.get('type') == 1:
-            GameUtils.clear_screen()
             builder.set_title(menu_info['title'])
             builder.set_desc(menu_info.get('desc', 'Choose an option below:'))
             builder.desc_enabled(True)
             builder.set_prompt(menu_info.get('prompt', 'Select an option to Proceed\n >'))
         #NOTE This Factory is for type 2 Menus for Environments with NPCs
         elif menu_info.get('type') == 2 and environment_info.get('has_npc', 'no') == 'no':
-            GameUtils.clear_screen()
             builder.set_title(environment_name)
             builder.set_desc(environment_info.get('description', "No Environment Description If you see this I've messed up somewhere."))
             builder.desc_enabled(True)
             builder.set_prompt(menu_info.get('prompt', 'Select an option to Proceed\n >'))
         #NOTE This Factory is for type 2 Menus for Environments with NPCs
         elif menu_info.get('type') == 2 and environment_info.get('has_npc', 'no') == 'yes':
-            GameUtils.clear_screen()
             npc = self.game_state.npc_manager.get_npc_by_position(self.game_state.player_position)
             builder.set_title(environment_name)
             builder.set_desc(f"{environment_info.get('description', 'No Environment Description If you see this I have messed up somewhere.')}""\nNPCs at your current location:"f"\n{self.game_state.npc_manager.intro_to_npc(self.game_state.player_position)}")
             builder.desc_enabled(True)
             builder.set_prompt(menu_info.get('prompt', 'Select an option to Proceed\n >'))
-            builder.add_option(f"Talk to {npc.name}", lambda _: (self.game_state.npc_manager.interact_with_npc(self.game_state.player_position)))
+            builder.add_option(f"Talk to {npc.name}", action_handlers['talkNPC'])
         #NOTE This Factory is for type 3 Menus, AKA The Move Menu
         #COMMENT Has an If Statement that serves as the trigger for the secret ending option, if the conditions are met
         elif menu_info.get('type') == 3:
-            GameUtils.clear_screen()
             builder.set_title(environment_name)
             builder.desc_enabled(True)
-            builder.set_desc(self.game_state.player_position)
+            builder.set_desc(list(self.game_state.player_position))  # Copied, the menu is cached
             builder.set_prompt(menu_info.get("prompt", 'Select an option to Proceed\n >'))
             #USEFUL Secret 'One Above All' Ending Trigger
-            if self.game_state.inventory_manager.has_item('Aincent Tome') and self.game_state.inventory_manager.has_item('Aincent Sword') and self.game_state.inventory_manager.has_item('Aincent Shield'):
-                builder.add_option("go to The End.", 'finale')
+            #NOTE Only checked when the menu is built, which happens again after any change to the inventory
+            if all(self.game_state.inventory_manager.has_item(item) for item in GameUI.SECRET_ENDING_ITEMS):
+                builder.add_option("go to The End.", action_handlers['finale'])  #BUGFIX Was passing the action name instead of its handler
         #NOTE This Factory is for type 4 Menus (Currently Does Not Exist)
         if menu_info.get('type') == 4:
-            GameUtils.clear_screen()
             builder.set_title(menu_info['title'])
             builder.set_prompt(menu_info.get('prompt', 'Select an option to Proceed\n >'))
-        #NOTE This Factory is for type 5 Menus (Currently Does Not Exist)
+        #NOTE This Factory is for type 5 Menus, AKA The Travel Menu
+        #COMMENT Has an option for every environment that can be reached from here, closest first
+        #NOTE A page at a time, as many as fit on the screen, so the title and go back never scroll out of sight
         elif menu_info.get('type') == 5:
-            GameUtils.clear_screen()
-            pass
+            if self.game_state.world_pack is not None:
+                print("You can't travel on this map, move one step at a time instead.")
+                return None
+            builder.set_title(environment_name)
+            builder.desc_enabled(True)
+            builder.set_desc("Where would you like to go?")
+            builder.set_prompt(menu_info.get("prompt", 'Select an option to Proceed\n >'))
+            world, content = game_data.world, game_data.content
+            reachable = world.reachable(self.game_state.environment_manager.environment_id)
+            destinations = sorted((steps, content.environment_names[place]) for place, steps in reachable.items() if steps)
+            #COMMENT Fills each page with as many destinations as fit in the rows left over, counting options that wrap as more than one
+            size = self.game_state.screen.size()
+            rows_per_page = max(3, size.lines - GameUI.TRAVEL_MENU_ROWS)
+            pages, rows = [[]], 0
+            for steps, name in destinations:
+                text = f"travel to {name} ({steps} step{'s' if steps != 1 else ''})"
+                height = -(-len(f"Enter {len(pages[-1]) + 1} to {text}") // max(1, size.columns))
+                if pages[-1] and rows + height > rows_per_page:
+                    pages.append([])
+                    rows = 0
+                pages[-1].append((text, name))
+                rows += height
+            page = self.menu_page % len(pages)
+            for text, name in pages[page]:
+                builder.add_option(text, lambda _, name=name: action_handlers['travel'](name))
+            if len(pages) > 1:
+                builder.add_option(f"see more places (page {page + 1} of {len(pages)})", action_handlers['travel_more'])
         #NOTE This Factory is for type 6 Menus (Currently Does Not Exist)
         elif menu_info.get('type') == 6:
-            GameUtils.clear_screen()
             pass
         #COMMENT Add the options to the menu
         for option in menu_info['options']:
-            action = action_handlers.get(option['action'], lambda: print("Action not available"))
+            action = action_handlers.get(option['action'], lambda _: print("Action not available"))
             builder.add_option(option['text'], action)
-        #COMMENT Build and Display the created menu
-        menu = builder.build()
-        menu.display_menu()
-        return menu
+        #COMMENT Build the menu, get_menu caches it and the navigator displays it
+        return builder.build()
     
     
 
     def prepare_action_handlers(self):
         #COMMENT Maps user actions to functions. Additionally Contains a dictionary of used conditions
+        #NOTE Handlers return a JDDMenuNav saying which menu comes next, returning nothing stays on the current menu
         return {
             'leave': (lambda _: self.game_engine.exit_game()),
-            'spawnZone': (lambda _: self.create_and_display_menu('spawnMenu')),
-            'spawn_city': lambda _: (self.game_engine.spawn_player('city'), self.create_and_display_menu('gameMenu')),
-            'spawn_mountain': lambda _: (self.game_engine.spawn_player('mountain'), self.create_and_display_menu('gameMenu')),
-            'spawn_forest': lambda _: (self.game_engine.spawn_player('forest'), self.create_and_display_menu('gameMenu')),
-            'move_choice': (lambda _: self.create_and_display_menu('moveMenu')),
-            'move_n': lambda _: (self.game_engine.move('n'), self.create_and_display_menu('moveMenu')),
-            'move_s': lambda _: (self.game_engine.move('s'), self.create_and_display_menu('moveMenu')),
-            'move_e': lambda _: (self.game_engine.move('e'), self.create_and_display_menu('moveMenu')),
-            'move_w': lambda _: (self.game_engine.move('w'), self.create_and_display_menu('moveMenu')),
-            'backtogame': lambda _: self.create_and_display_menu('gameMenu'),
-            'search_area': lambda _: (self.game_engine.do_search()),
-            'examine_area': lambda _: (self.game_engine.do_examine(), self.create_and_display_menu('gameMenu')),
-            'status': lambda _: (self.game_engine.print_status(), self.create_and_display_menu('gameMenu')),
-            'talkNPC': lambda _: (self.npc_manager.interact_with_npc(self.game_state.player_position)),
+            'spawnZone': (lambda _: JDDMenuNav.push('spawnMenu')),
+            'spawn_city': lambda _: (self.game_engine.spawn_player('city'), JDDMenuNav.replace('gameMenu'))[-1],
+            'spawn_mountain': lambda _: (self.game_engine.spawn_player('mountain'), JDDMenuNav.replace('gameMenu'))[-1],
+            'spawn_forest': lambda _: (self.game_engine.spawn_player('forest'), JDDMenuNav.replace('gameMenu'))[-1],
+            'move_choice': (lambda _: JDDMenuNav.push('moveMenu')),
+            'travel_choice': lambda _: (self.turn_page(0), JDDMenuNav.push('travelMenu'))[-1],
+            'travel_more': lambda _: (self.turn_page(self.menu_page + 1), JDDMenuNav.replace('travelMenu'))[-1],
+            #NOTE Called with the destination's name by the options of the travel menu, not straight from the menu data
+            'travel': lambda destination: (self.game_engine.travel(destination), JDDMenuNav.pop('gameMenu'))[-1],
+            'move_n': lambda _: (self.game_engine.move('n'), JDDMenuNav.replace('moveMenu'))[-1],
+            'move_s': lambda _: (self.game_engine.move('s'), JDDMenuNav.replace('moveMenu'))[-1],
+            'move_e': lambda _: (self.game_engine.move('e'), JDDMenuNav.replace('moveMenu'))[-1],
+            'move_w': lambda _: (self.game_engine.move('w'), JDDMenuNav.replace('moveMenu'))[-1],
+            'backtogame': lambda _: JDDMenuNav.pop('gameMenu'),
+            'search_area': lambda _: (self.game_engine.do_search(), JDDMenuNav.replace('gameMenu'))[-1],
+            'examine_area': lambda _: (self.game_engine.do_examine(), JDDMenuNav.replace('gameMenu'))[-1],
+            'status': lambda _: (self.game_engine.print_status(), JDDMenuNav.replace('gameMenu'))[-1],
+            'save_game': lambda _: (self.game_engine.save_game(), JDDMenuNav.replace('gameMenu'))[-1],
+            #NOTE Loading goes into the game from the main menu, same as picking a starting location does
+            'load_game': lambda _: JDDMenuNav.push('gameMenu') if self.game_engine.load_game() else None,
+            'talkNPC': lambda _: self.game_state.npc_manager.interact_with_npc(self.game_state.player_position),
             'end_game': lambda _: self.game_engine.unsatisfied(),
             'finale': lambda _: self.game_state.combat_manager.Final_combat(),
             'runaway': lambda _: self.game_engine.HWHL(),
-            'nope': lambda _: (self.game_state.player_manager.update_quest('Run away with Princess Sandra?', 'Complete'), self.create_and_display_menu('moveMenu'))
+            'nope': lambda _: (self.game_state.player_manager.update_quest('Run away with Princess Sandra?', 'Complete'), JDDMenuNav.replace('moveMenu'))[-1]
         }
     
 
+class GamePacer:
+    #COMMENT Every pause in the game goes through here, so pacing for a whole session is set in one place
+    #NOTE time_scale 1.0 is normal speed for players, 0 skips every pause so tests, bots and benchmarks run at full speed.
+    #NOTE If not given, it is read from the JDDGAME_TIME_SCALE environment variable.
+    #NOTE wait, if given, is used instead of sleep and can cut a pause short: wait(seconds) returns True if the player
+    #NOTE skipped it (see JDDMenuIO.wait). Once a pause is skipped every pause until the next prompt is skipped too,
+    #NOTE so pressing Enter shows the rest of the narration straight away and the next command is read right after.
+    #COMMENT Set once a bad JDDGAME_TIME_SCALE has been reported, so a server doesn't repeat it for every session
+    warned = False
+
+    def __init__(self, time_scale=None, sleep=None, wait=None):
+        if time_scale is None:
+            time_scale = GamePacer.environment_scale()
+        if time_scale < 0:
+            raise ValueError(f"time_scale must be 0 or more, got {time_scale}")
+        self.time_scale = time_scale
+        self.sleep = sleep if sleep is not None else time.sleep
+        self.wait = wait
+        #COMMENT Total time spent pausing, in nanoseconds, GameMetrics leaves it out of the latencies it records
+        self.paused_ns = 0
+
+    @staticmethod
+    def environment_scale():
+        #COMMENT Reads JDDGAME_TIME_SCALE, a value that isn't a number 0 or over is reported and normal speed is used instead
+        value = os.environ.get('JDDGAME_TIME_SCALE', '1.0')
+        try:
+            time_scale = float(value)
+        except ValueError:
+            time_scale = -1.0
+        #NOTE not 0 <= time_scale also catches nan
+        if not 0 <= time_scale < float('inf'):
+            if not GamePacer.warned:
+                print(f"Warning: JDDGAME_TIME_SCALE is set to {value!r}, it has to be a number 0 or over. Using 1.0.")
+                GamePacer.warned = True
+            return 1.0
+        return time_scale
+
+    def pause(self, seconds):
+        #COMMENT Waits for the given number of game seconds, scaled by time_scale
+        delay = seconds * self.time_scale
+        if delay > 0:
+            start = time.perf_counter_ns()
+            if self.wait is not None:
+                self.wait(delay)
+            else:
+                self.sleep(delay)
+            self.paused_ns += time.perf_counter_ns() - start
+
+
+class GameRandom:
+    #COMMENT Seeded random number streams for one session, one for each part of the game that rolls dice
+    #NOTE Every stream is seeded from the session seed and its own name, so the same seed always plays out the same,
+    #NOTE and an extra draw in one part of the game (talking to an NPC one more time) doesn't change the others (the next fight).
+    STREAMS = ('exploration', 'encounters', 'combat', 'dialogue')
+
+    def __init__(self, seed=None):
+        self.seed = seed if seed is not None else random.SystemRandom().getrandbits(63)
+        for name in GameRandom.STREAMS:
+            setattr(self, name, random.Random(f"{self.seed}/{name}"))
+
+
+class GameRecording:
+    #COMMENT A session boiled down to its seed and every line of input it was given, which is enough to play it
+    #COMMENT again exactly, plus a digest of how the session ended up so a replay can check it got the same result.
+    #NOTE The digest is a hash of the session's save snapshot (see GameSave). Replays run with pauses skipped and their
+    #NOTE own empty save file, so a recording that loaded a save made before it started won't replay the same.
+    VERSION = 1
+
+    def __init__(self, seed, inputs, digest=None, start_menu='Main_Menu'):
+        self.seed = seed
+        self.inputs = list(inputs)
+        self.digest = digest
+        self.start_menu = start_menu
+
+    @classmethod
+    def capture(cls, game_state, start_menu='Main_Menu'):
+        #COMMENT Records a session from its seed and the input its io has logged
+        return cls(game_state.rng.seed, game_state.io.log or [], GameRecording.state_digest(game_state), start_menu)
+
+    @staticmethod
+    def state_digest(game_state):
+        return hashlib.blake2b(GameSave.dumps(game_state), digest_size=16).hexdigest()
+
+    def save(self, filepath):
+        #COMMENT Writes the recording as one small JSON document, the inputs joined into one string
+        with open(filepath, 'w') as file:
+            json.dump({'version': GameRecording.VERSION, 'seed': self.seed, 'start_menu': self.start_menu,
+                       'digest': self.digest, 'inputs': "\n".join(self.inputs)}, file)
+
+    @classmethod
+    def load(cls, filepath):
+        with open(filepath) as file:
+            recorded = json.load(file)
+        if recorded.get('version') != GameRecording.VERSION:
+            raise ValueError(f"Recording version {recorded.get('version')} can't be replayed by this version of the game.")
+        inputs = recorded['inputs'].split("\n") if recorded['inputs'] else []
+        return cls(recorded['seed'], inputs, recorded.get('digest'), recorded.get('start_menu', 'Main_Menu'))
+
+    def replay(self, filepath, game_data=None, world_pack=None):
+        #COMMENT Plays the recording again at full speed with its output thrown away, returns the finished game state
+        with tempfile.TemporaryDirectory() as save_dir, open(os.devnull, 'w') as null:
+            menu_io = JDDMenuIO(input_stream=StringIO("".join(line + "\n" for line in self.inputs)), output_stream=null)
+            with contextlib.redirect_stdout(null):
+                game_state = GameState(filepath, game_data=game_data, time_scale=0, io=menu_io, world_pack=world_pack,
+                                       save_path=os.path.join(save_dir, 'replay' + GameSave.SUFFIX), seed=self.seed)
+                game_engine = GameEngine(game_state=game_state, config_path=filepath)
+                game_ui = GameUI(game_state=game_state, game_engine=game_engine, config_path=filepath, game_data=game_data)
+                try:
+                    game_ui.create_and_display_menu(self.start_menu)
+                except SystemExit:
+                    pass
+        return game_state
+
+    def verify(self, filepath, game_data=None, world_pack=None):
+        #COMMENT Replays the recording, returns True if it ends in the same state it was recorded in
+        return GameRecording.state_digest(self.replay(filepath, game_data, world_pack)) == self.digest
+
+
+class GameMetrics:
+    #COMMENT Call counts and latency histograms for a session's menu actions and the engine's main methods, by name
+    #NOTE Actions are named 'action.' plus their key in prepare_action_handlers, methods by what they belong to ('combat.combat')
+    #NOTE Latencies include everything the call did (a search includes the fight it started) but not GamePacer pauses,
+    #NOTE so they show how long the code took and not how long the player was kept waiting on purpose.
+    #NOTE One GameMetrics can be shared by many sessions (the server does), their timings add up under the same names.
+    #COMMENT Methods timed on each part of a session, see instrument
+    METHODS = {
+        'engine': ('move', 'travel', 'spawn_player', 'do_search', 'do_examine', 'print_status', 'save_game', 'load_game'),
+        'environment': ('update_environment', 'search_area', 'examine_area'),
+        'combat': ('combat', 'choose_enemy', 'Final_combat'),
+        'npc': ('interact_with_npc',),
+        'player': ('update_quest', 'player_win'),
+        'quest': ('dispatch',),
+        'inventory': ('add_item', 'remove_item'),
+    }
+    #COMMENT Latencies are counted in buckets by powers of two, bucket n holds anything under 2**n microseconds
+    BUCKETS = 32
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self):
+        #COMMENT Name -> [calls, total nanoseconds, slowest nanoseconds, histogram]
+        self.stats = {}
+
+    def record(self, name, elapsed_ns):
+        stat = self.stats.get(name)
+        if stat is None:
+            stat = self.stats[name] = [0, 0, 0, [0] * GameMetrics.BUCKETS]
+        stat[0] += 1
+        stat[1] += elapsed_ns
+        if elapsed_ns > stat[2]:
+            stat[2] = elapsed_ns
+        stat[3][min((max(elapsed_ns, 0) // 1000).bit_length(), GameMetrics.BUCKETS - 1)] += 1
+
+    def timed(self, name, function, game_state):
+        #COMMENT Wraps function so every call to it is recorded under name
+        record = self.record
+        clock = time.perf_counter_ns
+
+        def timed_call(*args, **kwargs):
+            paused = game_state.pacer.paused_ns
+            start = clock()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                #NOTE In finally so calls that end the game with exit() are counted too
+                record(name, clock() - start - (game_state.pacer.paused_ns - paused))
+        return timed_call
+
+    def instrument(self, game_state, game_engine, action_handlers):
+        #COMMENT Times the session's engine methods, returns the action handlers wrapped the same way
+        #NOTE Managers are timed by instrument_part when the game state makes them
+        self.instrument_part('engine', game_engine, game_state)
+        return {key: self.timed(f"action.{key}", handler, game_state) for key, handler in action_handlers.items()}
+
+    def instrument_part(self, part, target, game_state):
+        #COMMENT Times the methods listed in METHODS for one part of a session
+        #NOTE The methods are replaced on the instance only, other sessions and the classes stay as they were
+        for method_name in GameMetrics.METHODS.get(part, ()):
+            setattr(target, method_name, self.timed(f"{part}.{method_name}", getattr(target, method_name), game_state))
+
+    def report(self):
+        #COMMENT Summary of every name in microseconds, slowest in total first
+        #NOTE Percentiles come from the histogram, so they are the top of the bucket they fall in (at most the slowest call)
+        summary = {}
+        for name, (calls, total, slowest, histogram) in sorted(self.stats.items(), key=lambda item: -item[1][1]):
+            entry = {'calls': calls, 'total_ms': total / 1e6, 'mean_us': total / calls / 1000}
+            for percentile in GameMetrics.PERCENTILES:
+                target = calls * percentile / 100
+                seen = 0
+                for bucket, count in enumerate(histogram):
+                    seen += count
+                    if seen >= target:
+                        break
+                entry[f"p{percentile}_us"] = min(2 ** bucket, slowest / 1000)
+            entry['max_us'] = slowest / 1000
+            entry['histogram'] = {f"<{2 ** bucket}us": count for bucket, count in enumerate(histogram) if count}
+            summary[name] = entry
+        return summary
+
+    def format_report(self):
+        #COMMENT Lays the report out as a text table
+        lines = [f"{'Name':<34}{'calls':>8}{'total ms':>11}{'mean us':>10}{'p50 us':>10}{'p90 us':>10}{'p99 us':>10}{'max us':>11}"]
+        for name, entry in self.report().items():
+            lines.append(f"{name:<34}{entry['calls']:>8}{entry['total_ms']:>11.2f}{entry['mean_us']:>10.1f}{entry['p50_us']:>10.1f}"
+                         f"{entry['p90_us']:>10.1f}{entry['p99_us']:>10.1f}{entry['max_us']:>11.1f}")
+        return "\n".join(lines)
+
+    def save(self, filepath):
+        #COMMENT Swaps the report in whole, so a worker stopped halfway through never leaves a truncated file
+        temp_path = f"{filepath}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w') as file:
+                json.dump(self.report(), file, indent=4)
+            os.replace(temp_path, filepath)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+
 class GameUtils:
     @staticmethod
     def load_data(filepath):
         try:
-            with open(filepath, 'r') as file:
-                return json.load(file)
+            with open(filepath, 'rb') as file, GameUtils.gc_paused():
+                return GameUtils.decode_json(file.read())
         except FileNotFoundError:
             print(f"Error: The file {filepath} was not found.")
             return {}
-        except json.JSONDecodeError:
+        except ValueError:
             print(f"Error: Could not decode JSON from the file {filepath}.")
             return {}
-        
+
+    @staticmethod
+    def decode_json(raw):
+        #COMMENT Decodes JSON bytes, using orjson when it is installed
+        if orjson is not None:
+            return orjson.loads(raw)
+        return json.loads(raw)
+
+    @staticmethod
+    def encode_json(value):
+        #COMMENT Encodes to compact JSON bytes, using orjson when it is installed
+        if orjson is not None:
+            return orjson.dumps(value)
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    @contextlib.contextmanager
+    def gc_paused():
+        #COMMENT Pauses the garbage collector while a big tree of containers is built
+        #NOTE Decoding only allocates, so the collector passes it triggers are wasted work (and most of the load time)
+        was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            yield
+        finally:
+            if was_enabled:
+                gc.enable()
+
+    #COMMENT Renderer for code that has no game state to clear the screen through
+    screen = JDDRenderer()
 
     @staticmethod
     def clear_screen():
         #COMMENT Clears the console screen
-        if os.name == 'nt':
-            os.system('cls')
-        else:
-            os.system('clear')
+        #NOTE Uses escape sequences instead of running cls/clear, game code clears through game_state.screen
+        GameUtils.screen.clear()
 
-    def GoodPrint(input):
+    @staticmethod
+    def GoodPrint(input, pacer=None):
         #COMMENT Prints text to the console with a delay for each character
         #NOTE Does not like to work :(
+        pacer = pacer if pacer is not None else GamePacer()
         for character in input:
             sys.stdout.write(character)
             sys.stdout.flush()
-            time.sleep(0.05)
+            pacer.pause(0.05)
         print("\n")
 
-def main():
+def check_content(file_path):
+    #COMMENT Compiles the game data and prints every problem found, returns True if nothing would break the game
+    game_data = GameData.load(file_path, use_cache=False)
+    content = game_data.content
+    errors = content.errors()
+    #COMMENT The compiled tables have to be plain data, or the cache only works for whichever program wrote it
+    problem = GameDataCache.plain({'content': content.tables(), 'world': game_data.world.tables()})
+    if problem is not None:
+        errors = errors + [problem]
+    for message in errors:
+        print(f"Error: {message}")
+    for message in content.warnings():
+        print(f"Warning: {message}")
+    print(f"{len(errors)} errors, {len(content.warnings())} warnings")
+    return not errors
+
+def main(argv=None):
     #COMMENT Main function to start the game
+    #NOTE Usage: python JDDGame.py [path to GameData.JSON] [--check] [--pack PACK [--chunk-size N]] [--world PACK] [--save SAVE]
+    #NOTE                           [--seed N] [--record FILE | --replay FILE] [--metrics FILE] [--profile FILE]
+    #NOTE --check only validates the game data (exit code 1 if it has errors), run it before shipping content changes
+    #NOTE --pack writes the game data's environments to a world pack and exits, --world plays with the map from one
+    #NOTE --record writes the session's seed and inputs to a file when the game ends, --replay plays one back at
+    #NOTE full speed and checks it ends the same way (exit code 1 if it doesn't), see GameRecording
+    #NOTE --metrics times every action and main engine method and writes the numbers to a JSON file when the game ends,
+    #NOTE see GameMetrics, --profile runs the session under cProfile and writes its stats (read them with pstats or snakeviz)
+    parser = argparse.ArgumentParser(description="JDDGame, a text adventure.")
+    parser.add_argument('gamedata', nargs='?', default=None, help="Path to the GameData.JSON file")
+    parser.add_argument('--check', action='store_true', help="Validate the game data and exit")
+    parser.add_argument('--pack', default=None, help="Write the game data's environments to this world pack and exit")
+    parser.add_argument('--chunk-size', type=int, default=16, help="Width and height of a world pack chunk, in tiles")
+    parser.add_argument('--world', default=None, help="Stream the map from this world pack")
+    parser.add_argument('--save', default=None, help="Save file for Save Game and Load Game")
+    parser.add_argument('--seed', type=int, default=None, help="Seed for everything random in the session")
+    parser.add_argument('--record', default=None, help="Record the session's inputs to this file")
+    parser.add_argument('--replay', default=None, help="Replay a recorded session and check it ends the same")
+    parser.add_argument('--metrics', default=None, help="Write call counts and latencies of the session's actions to this file")
+    parser.add_argument('--profile', default=None, help="Profile the session and write the cProfile stats to this file")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error(f"--chunk-size must be 1 or more, got {args.chunk_size}")
 
     #COMMENT Input file path to the gamedata file manually 
     #USEFUL THIS IS HIGHLY RECOMMENDED
     file_path = '' 
     #COMMENT Un-Comment to use, Enter File path on each run # NOT RECOMMENDED
     #file_path = input("Enter the path to the game configuration file: ") 
-
+    if args.gamedata:
+        file_path = args.gamedata
+    if args.check:
+        sys.exit(0 if check_content(file_path) else 1)
+    if args.pack:
+        chunk_count = GameWorldPack.write(GameUtils.load_data(file_path).get('environments', {}), args.pack, args.chunk_size)
+        print(f"Wrote {chunk_count} chunks to {args.pack}")
+        sys.exit(0)
+    world_pack = GameWorldPack(args.world) if args.world else None
+    if args.replay:
+        recording = GameRecording.load(args.replay)
+        same = recording.verify(file_path, world_pack=world_pack)
+        print(f"Replayed {len(recording.inputs)} inputs with seed {recording.seed}: {'same end state' if same else 'END STATE DIFFERS'}")
+        sys.exit(0 if same else 1)
+
+    #COMMENT Turns on input logging for --record
+    menu_io = JDDMenuIO()
+    if args.record:
+        menu_io.log = []
+    metrics = GameMetrics() if args.metrics else None
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
     try:
-        game_state = GameState(filepath=file_path)
+        game_state = GameState(filepath=file_path, world_pack=world_pack, save_path=args.save, seed=args.seed, io=menu_io,
+                               metrics=metrics)
+        for message in game_state.game_data.content.errors():
+            print(f"Game data error: {message}")
         game_engine = GameEngine(game_state=game_state, config_path=file_path)
         game_ui = GameUI(game_state=game_state, game_engine=game_engine, config_path=file_path)
         def start_game():
             #COMMENT Display the Main Menu
-            game_ui.create_and_display_menu('Main_Menu')
+            #NOTE Everything printed goes through the renderer's watch, so it knows when the screen has scrolled past the menu
+            with contextlib.redirect_stdout(game_state.screen.watch(sys.stdout)):
+                game_ui.create_and_display_menu('Main_Menu')
         start_game()
     except Exception as e:
         raise
+    finally:
+        #NOTE In finally so sessions that end by exit() (every ending does) are still recorded
+        if args.record and 'game_state' in locals():
+            GameRecording.capture(game_state).save(args.record)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if metrics is not None:
+            metrics.save(args.metrics)
+            print("\n" + metrics.format_report())
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
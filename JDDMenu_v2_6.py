@@ -12,6 +12,12 @@ Key Concepts:
 - 'JDDMenuBuilder': Used for building the menu with context-aware actions.
 - 'JDDMenu': Displays the menu and handles user interaction, executing actions based on user input and context.
 - 'JDDMenuUtils': Useful utility functions to help create menus
+- 'JDDMenuIO': The input and output streams a menu talks to. Defaults to the console, but can be any 
+  file-like objects (pipes, sockets, StringIO) so the menus can be hosted inside other programs.
+- 'JDDRenderer': Optional screen renderer for menus. Redraws only the lines that changed, using escape 
+  sequences instead of running a clear command.
+- 'JDDMenuNav' / 'JDDMenuNavigator': Lets actions say which menu comes next (push/replace/pop) instead of 
+  opening it themselves, so one loop drives every menu and the call stack never grows.
 
 Usage of MenuUtils Features:
 
@@ -44,6 +50,14 @@ application state and user roles, enhancing user experience and system functiona
 
 """
 
+import os
+import re
+import select
+import shutil
+import sys
+import time
+from collections import deque
+
 
 class JDDMenu:
     """
@@ -65,6 +79,8 @@ class JDDMenu:
                         user input errors and allows for continuous operation until an exit condition
                         is met (like selecting an 'exit' option).
 
+        show() / select(line): The two halves of display_menu, for driving a menu one line of input at a time.
+
         continue_choice(): If enabled, prompts the user and asks if they would lke to continue using
                            the program. if they do not, it ends the program. This is disabled by default. 
 
@@ -96,9 +112,42 @@ class JDDMenu:
         * Desc - Defaults to False
         More Info in JDDMenuBuilder Documentation
     - Fixed JDDMenuBuilder not passing the cont parameter to JDDMenu
+
+    Change Log from v2_6 to v2_7 (file name kept so existing imports keep working)
+    - Added JDDMenuNav and JDDMenuNavigator
+        * If an action returns a JDDMenuNav, display_menu returns it instead of looping again
+        * display_menu returns None when the user exits the menu
+    - Added JDDRenderer
+        * Menus given a renderer draw themselves as one frame, only rewriting the lines that changed
+        * Invalid selection messages are drawn as part of the frame so a redraw doesn't erase them
+        * Menus without a renderer print exactly like they used to
+    - Added JDDMenuIO, menus read and write through it instead of input() and print()
+        * Output is buffered and written out once, right before each prompt
+        * Set with the new io parameter, or JDDMenuBuilder.set_io
+    - continue_choice no longer calls exit(), it returns False and display_menu returns JDDMenuNav.exit()
+    - Running out of input (closed pipe or connection) ends the menus the same way instead of raising EOFError
+    - Split display_menu into show() and select(line) so menus can be driven one line at a time
+        * JDDMenuNavigator.start and JDDMenuNavigator.feed use them to run menus without ever blocking on input,
+          for hosting many sessions in one program (see JDDServer)
+        * select returns JDDMenu.STAY when the menu should wait for more input
+        * Menus with cont enabled still ask the continue question through read_line
+    - JDDMenuIO can log every line of input it reads (JDDMenuIO.log), for recording and replaying sessions
+    - JDDRenderer checks the terminal size, frames that don't fit and screens that scrolled are redrawn in full
+        * Console output sent through JDDRenderer.watch is counted, so the renderer knows when it scrolled the screen
+    - Added JDDMenuIO.wait, for waiting out a pause in a way the user can cut short
+        * Input that arrives during the wait is kept for the next read_line instead of being lost
+        * A blank line just cuts the wait short, it isn't kept
+    - Menus take several choices on one line ("1 1 3 2"), run one after another
+        * JDDMenuIO.typeahead queues every choice after the first in pending, menus read with read_line(split=True)
+          and JDDMenuNavigator.feed splits every line it is given. Other read_line calls (like continue_choice)
+          get the whole line
+        * display_menu and JDDMenuNavigator.feed don't draw the menus in between, only the one waiting for more input
+        * An invalid selection drops the rest of the queued choices
     """
+    # Returned by select when the menu stays open and waits for more input
+    STAY = "stay"
 
-    def __init__(self, menu_options, title="Menu", enable_title=True, desc="Description", enable_desc=False, prompt="Select an option: ", exit_option_text="Exit",  cont=False):
+    def __init__(self, menu_options, title="Menu", enable_title=True, desc="Description", enable_desc=False, prompt="Select an option: ", exit_option_text="Exit",  cont=False, renderer=None, io=None):
         """
         Initializes a new instance of JDDMenu.
         """
@@ -110,62 +159,133 @@ class JDDMenu:
         self.prompt = prompt
         self.exit_option_text = exit_option_text
         self.cont = cont
+        self.renderer = renderer
+        self.io = io if io is not None else JDDMenuIO()
+        self.notice = None
 
 
     def display_menu(self, context=None):
         """
         Displays the menu and handles user input to execute corresponding actions.
+
+        Returns:
+        JDDMenuNav or None: The navigation result of the action that ended the menu, or None if the user exited.
+                            JDDMenuNav.exit() if the user chose not to continue or the input ran out.
         """
         while True:
-            # If enable title is true (Default: True) then it prints a title
-            if self.enable_title:
-                print(self.title)
-            # If enable desc is true (Default: False) then it prints a description
-            if self.enable_desc:
-                print(self.desc)
-
-            print('-' * len(self.title))  # Simple underline for the title and description
-
-            for index, (option_text, _) in enumerate(self.menu_options, start=1):
-                print(f"Enter {index} to {option_text}")
-            
-
+            # Choices typed ahead are run straight away, without drawing a menu nobody will look at
+            if not self.io.pending:
+                self.show()
             try:
-                choice = int(input(self.prompt))
-                if choice < 0 or choice > len(self.menu_options):
-                    raise ValueError("Selection out of range")
-
-                if choice == 0:
-                    print("Exiting menu.")
-                    break
+                line = self.io.read_line(self.prompt, split=True)
+            except EOFError:
+                # Nothing left to read, so nobody is left to use the menu
+                self.io.flush()
+                return JDDMenuNav.exit()
+            if self.renderer is not None:
+                # The terminal echoes what the user typed itself, so the renderer is told about that row here
+                self.renderer.wrote(line + "\n")
+            result = self.select(line, context)
+            if result is not JDDMenu.STAY:
+                return result
+
+    def show(self):
+        """
+        Writes the menu to its io, along with the notice from the last invalid selection (if any).
+        Doesn't write the prompt or wait for input, display_menu and JDDMenuNavigator.feed do that.
+        """
+        if self.renderer is not None:
+            # Draws the whole menu as one frame, the notice (if any) is drawn under the options
+            self.io.write(self.renderer.render(self.frame() + ([self.notice] if self.notice else [])))
+        else:
+            self.io.write("\n".join(self.frame()) + "\n")
+        self.notice = None
+
+    def select(self, line, context=None):
+        """
+        Handles one line of input as if the user typed it at the prompt, running the chosen action.
 
-                _, action = self.menu_options[choice - 1]
-                action(context)
-                if self.cont:
-                    self.continue_choice()
-                
+        Parameters:
+        line (str): The user's input.
+        context (dict): discussed within the module level docstring, passed to the action.
 
-            except ValueError as e:
-                print(f"Invalid selection: {e}. Please try again.")
+        Returns:
+        JDDMenuNav, None or JDDMenu.STAY: What display_menu would return for this input (see display_menu), 
+                                          or JDDMenu.STAY if the menu should be shown again and wait for more input.
+        """
+        try:
+            choice = int(line)
+            if choice < 0 or choice > len(self.menu_options):
+                raise ValueError("Selection out of range")
+
+            if choice == 0:
+                self.io.write("Exiting menu.\n")
+                self.io.flush()
+                return None
+
+            _, action = self.menu_options[choice - 1]
+            result = action(context)
+            if self.cont:
+                try:
+                    if not self.continue_choice():
+                        return JDDMenuNav.exit()
+                except EOFError:
+                    self.io.flush()
+                    return JDDMenuNav.exit()
+            # Actions that return a JDDMenuNav hand control back to whoever is driving the menus
+            if isinstance(result, JDDMenuNav):
+                return result
+
+        except ValueError as e:
+            self.notice = f"Invalid selection: {e}. Please try again."
+            # The rest of the choices typed ahead were meant for menus this one didn't lead to
+            self.io.pending.clear()
+            if self.renderer is None:
+                self.io.write(self.notice + "\n")
+        return JDDMenu.STAY
+
+    def frame(self):
+        """
+        Returns the lines that make up the menu, without the prompt.
 
+        Returns:
+        list of str: The title, description, underline and options, depending on which are enabled.
+        """
+        lines = []
+        # If enable title is true (Default: True) then it adds a title
+        if self.enable_title:
+            lines.append(str(self.title))
+        # If enable desc is true (Default: False) then it adds a description
+        if self.enable_desc:
+            lines.append(str(self.desc))
+
+        lines.append('-' * len(self.title))  # Simple underline for the title and description
+
+        for index, (option_text, _) in enumerate(self.menu_options, start=1):
+            lines.append(f"Enter {index} to {option_text}")
+        return lines
     
 
     def continue_choice(self):
         """
         Prompts the user to either continue using the application or exit.
+
+        Returns:
+        bool: True if the user wants to continue, False if they want to exit.
         """
         while True:
             try:
-                continue_choice = input("Do you want to continue? (yes/no): ").lower()
+                continue_choice = self.io.read_line("Do you want to continue? (yes/no): ").lower()
                 if continue_choice in ['yes', 'y']:
-                    break  # Breaks out of the continue_choice loop and goes back to the main menu
+                    return True  # Goes back to the menu
                 elif continue_choice in ['no', 'n']:
-                    print("Exiting menu.")
-                    exit()  # Exits the program
+                    self.io.write("Exiting menu.\n")
+                    self.io.flush()
+                    return False  # The caller decides how to exit, instead of killing the program here
                 else:
                     raise ValueError
             except ValueError:
-                print("Invalid input. Please answer with 'yes' or 'no'.")
+                self.io.write("Invalid input. Please answer with 'yes' or 'no'.\n")
 
 
 class JDDMenuBuilder:
@@ -238,6 +358,8 @@ class JDDMenuBuilder:
         self.exit_option_text = "Exit"
         self.prompt = "Select an option: "
         self.cont = False
+        self.renderer = None
+        self.io = None
 
     def add_option(self, option_text, action):
         """
@@ -350,6 +472,32 @@ class JDDMenuBuilder:
         self.cont = cont
         return self
 
+    def set_renderer(self, renderer):
+        """
+        Sets the renderer the menu draws itself with. If not given a value, the menu prints its lines like before.
+
+        Parameters:
+        renderer (JDDRenderer): The renderer to draw the menu with, usually shared by every menu on the same screen.
+
+        Returns:
+        JDDMenuBuilder: The instance of the builder to allow for method chaining.
+        """
+        self.renderer = renderer
+        return self
+
+    def set_io(self, io):
+        """
+        Sets the streams the menu reads input from and writes output to. If not given a value, the menu uses the console.
+
+        Parameters:
+        io (JDDMenuIO): The streams for the menu, usually shared by every menu in the same session.
+
+        Returns:
+        JDDMenuBuilder: The instance of the builder to allow for method chaining.
+        """
+        self.io = io
+        return self
+
     def build(self):
         """
         Constructs and returns a JDDMenu object with the configured options, title, exit text, and prompt.
@@ -357,7 +505,601 @@ class JDDMenuBuilder:
         Returns:
         JDDMenu: The constructed JDDMenu object with the specified settings.
         """
-        return JDDMenu(self.menu_options, self.title, self.enable_title, self.desc, self.enable_desc, self.prompt, self.exit_option_text, self.cont)
+        return JDDMenu(self.menu_options, self.title, self.enable_title, self.desc, self.enable_desc, self.prompt, self.exit_option_text, self.cont, self.renderer, self.io)
+
+
+class JDDMenuIO:
+    """
+    The input and output streams that menus talk to.
+
+    By default this is the console, and behaves exactly like input() and print(). Any other file-like 
+    objects can be given instead, a readable one for input (anything with readline()) and a writable 
+    one for output (anything with write() and flush()), so the menus can be driven over pipes, sockets 
+    or from inside another program.
+
+    Output is buffered, and only written out (in one write) when flush() is called. Reading a line 
+    flushes first, so everything a menu writes reaches the user once per prompt.
+
+    Attributes:
+        input_stream (file-like or None): Where input is read from. None means the console.
+        output_stream (file-like or None): Where output is written. None means whatever sys.stdout is at the time.
+        log (list of str or None): Set to a list to keep every line of input the menus are given, in order.
+                                   Lines handed to JDDMenuNavigator.feed are logged too.
+        pending (deque of str): Input that hasn't been read yet, read_line returns these first. Holds lines typed
+                                during a wait() and the choices after the first on a line with several (see typeahead).
+        interrupted (bool): True once the user has cut a wait() short, until the next read_line. Every wait() in
+                            between returns straight away, so the rest of whatever was being paced comes out at once.
+
+    Usage example:
+        io = JDDMenuIO(input_stream=connection.makefile("r"), output_stream=connection.makefile("w"))
+        builder.set_io(io)
+    """
+
+    def __init__(self, input_stream=None, output_stream=None):
+        """
+        Initializes a new instance of JDDMenuIO.
+        """
+        self.input_stream = input_stream
+        self.output_stream = output_stream
+        self.buffer = []
+        self.log = None
+        self.pending = deque()
+        self.interrupted = False
+
+    def output(self):
+        """
+        Returns:
+        file-like: The stream output is written to right now.
+        """
+        return self.output_stream if self.output_stream is not None else sys.stdout
+
+    def isatty(self):
+        """
+        Returns:
+        bool: True if the output is a terminal, used by JDDRenderer to decide on escape sequences.
+        """
+        isatty = getattr(self.output(), "isatty", None)
+        return bool(isatty and isatty())
+
+    def write(self, text):
+        """
+        Adds text to the output buffer.
+        """
+        if text:
+            self.buffer.append(text)
+
+    def flush(self):
+        """
+        Writes everything in the output buffer in a single write.
+        """
+        stream = self.output()
+        if self.buffer:
+            stream.write("".join(self.buffer))
+            self.buffer.clear()
+        stream.flush()
+
+    def logged(self, line):
+        """
+        Adds a line of input to the log, if logging is turned on.
+
+        Returns:
+        str: The same line, so it can be passed straight through.
+        """
+        if self.log is not None:
+            self.log.append(line)
+        return line
+
+    def show_prompt(self, prompt):
+        """
+        Writes the prompt and flushes, for when the input will be handed over later instead of read here.
+        """
+        self.write(prompt)
+        self.flush()
+
+    def wait(self, seconds):
+        """
+        Waits for up to seconds, or until the user enters a line, whichever comes first.
+
+        Only input that can be waited on (the console or a pipe, on systems with select) can cut a wait short,
+        anything else just sleeps. A line entered during the wait is kept in pending for the next read_line,
+        unless it is blank.
+
+        Parameters:
+        seconds (float): The longest time to wait.
+
+        Returns:
+        bool: True if the wait was cut short (now or by an earlier wait since the last read_line).
+        """
+        if self.interrupted:
+            return True
+        self.flush()
+        stream = self.input_stream if self.input_stream is not None else sys.stdin
+        try:
+            ready = select.select([stream], [], [], seconds)[0]
+        except (OSError, ValueError, TypeError):
+            # Not something select can wait on (StringIO, or the Windows console)
+            time.sleep(seconds)
+            return False
+        if not ready:
+            return False
+        self.interrupted = True
+        line = stream.readline()
+        if line and line.strip():
+            self.pending.append(line.rstrip("\r\n"))
+        return True
+
+    def typeahead(self, line):
+        """
+        Splits a line holding several choices separated by spaces (like "1 1 3 2") so they can be run one after 
+        another. Every choice after the first is queued at the front of pending, so they are read next.
+
+        Parameters:
+        line (str): A line of input.
+
+        Returns:
+        str: The first choice on the line, or the line itself if it is blank.
+        """
+        first, *rest = line.split() or [line]
+        self.pending.extendleft(reversed(rest))
+        return first
+
+    def read_line(self, prompt="", split=False):
+        """
+        Flushes the output, shows the prompt and reads one line of input.
+        Input already in pending is returned first, without reading anything.
+
+        Parameters:
+        prompt (str): Text shown right before the input.
+        split (bool): True to take the line as several choices (see typeahead) and only return the first.
+                      Menus pass True, anything asking for text (yes/no, names) should leave it off to get the whole line.
+
+        Returns:
+        str: The line (or first choice) that was read, without its line ending.
+
+        Raises:
+        EOFError: If there is no more input.
+        """
+        self.interrupted = False
+        if self.pending:
+            self.show_prompt(prompt)
+            line = self.pending.popleft()
+            line = self.typeahead(line) if split else line
+            self.write(line + "\n")
+            return self.logged(line)
+        if self.input_stream is None and self.output_stream is None:
+            self.flush()
+            line = input(prompt)  # Keeps line editing on the console
+        else:
+            self.show_prompt(prompt)
+            stream = self.input_stream if self.input_stream is not None else sys.stdin
+            line = stream.readline()
+            if not line:
+                raise EOFError("No more input")
+            line = line.rstrip("\r\n")
+        return self.logged(self.typeahead(line) if split else line)
+
+
+class JDDRenderer:
+    """
+    Draws full screen frames to the console, rewriting only the lines that changed since the last frame.
+
+    Clearing the screen is done with escape sequences instead of running 'clear'/'cls' (which starts a 
+    new process every time), and each frame is sent to the console in a single write. The renderer 
+    remembers the last frame it drew, so redrawing a menu after a move only rewrites the title and 
+    whatever else changed. Anything printed below the frame since the last draw (prompts, messages) 
+    is cleared when the next frame is drawn.
+
+    Only rows that are still where the last frame put them can be rewritten. A frame taller or wider than 
+    the terminal, or output below the last frame that scrolled the screen, makes the next frame a full redraw. 
+    To know what was printed below the frame, the console output has to go through watch() (or call 
+    invalidate() after printing).
+
+    When the output is not a terminal (piped to a file or another program) escape sequences are left 
+    out and frames are just written out in full.
+
+    Attributes:
+        stream (file-like): Where frames are written. None means whatever sys.stdout is at the time of writing.
+        ansi (bool or None): True/False forces escape sequences on/off, None decides based on the stream.
+        previous (list of str or None): The lines of the last frame drawn, None if the screen was cleared since
+                                        (or scrolled, or the frame didn't fit on it).
+        below (int): Screen rows written under the last frame since it was drawn, see wrote().
+
+    Methods:
+        draw(lines): Draws a frame. Lines may contain newlines, each one counts as its own screen row.
+        clear(): Clears the screen, the next frame is drawn in full.
+        invalidate(): Forgets the last frame without touching the screen, use after writing over it some other way.
+        watch(stream): Wraps the console stream so everything printed to it is counted by wrote().
+
+    Usage example:
+        renderer = JDDRenderer()
+        builder.set_renderer(renderer)
+        with contextlib.redirect_stdout(renderer.watch(sys.stdout)):
+            menu.display_menu()
+    """
+    HOME = "\x1b[H"
+    CLEAR_SCREEN = "\x1b[2J"
+    CLEAR_LINE = "\x1b[K"
+    CLEAR_BELOW = "\x1b[J"
+    ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+
+    def __init__(self, stream=None, ansi=None):
+        """
+        Initializes a new instance of JDDRenderer.
+        """
+        self.stream = stream
+        self.ansi = ansi
+        self.previous = None
+        self.below = 0
+        self.column = 0
+        # The last frame render() returned, until it is written through watch()
+        self.unsent = None
+        if os.name == 'nt':
+            os.system('')  # Turns on escape sequence support in the Windows console, once instead of every clear
+
+    def output(self):
+        """
+        Returns:
+        file-like: The stream to write to right now.
+        """
+        return self.stream if self.stream is not None else sys.stdout
+
+    def uses_ansi(self, stream):
+        """
+        Returns:
+        bool: True if escape sequences should be written to the stream.
+        """
+        if self.ansi is not None:
+            return self.ansi
+        isatty = getattr(stream, "isatty", None)
+        return bool(isatty and isatty())
+
+    def size(self):
+        """
+        Returns:
+        os.terminal_size: The terminal's columns and lines (80x24 if it can't be found out).
+        """
+        return shutil.get_terminal_size()
+
+    def wrote(self, text):
+        """
+        Counts the screen rows text takes up when it is printed under the last frame, including rows that 
+        wrap. Once the frame and the rows under it no longer fit on the screen, the screen has scrolled and 
+        the last frame is forgotten so the next one is drawn in full.
+
+        Parameters:
+        text (str): Text that was written to the console.
+        """
+        if self.unsent and self.unsent in text:
+            # The frame itself, anything before it in the same write came out before the frame was drawn
+            text = text.split(self.unsent, 1)[1]
+            self.unsent = None
+        text = self.ESCAPE.sub("", text)
+        columns = max(1, self.size().columns)
+        *lines, last = text.split("\n")
+        for line in lines:
+            length = self.column + len(line)
+            self.below += 1 + max(0, length - 1) // columns
+            self.column = 0
+        self.column += len(last)
+        if self.previous is not None and len(self.previous) + self.below + self.column // columns >= self.size().lines:
+            self.previous = None
+
+    def watch(self, stream):
+        """
+        Parameters:
+        stream (file-like): The console stream, usually sys.stdout.
+
+        Returns:
+        JDDRenderer.Watched: A stream that writes to stream and tells this renderer what was written.
+        """
+        return JDDRenderer.Watched(stream, self)
+
+    class Watched:
+        """
+        A stream that passes everything on to another one, telling a renderer what was written (see JDDRenderer.watch).
+        """
+
+        def __init__(self, stream, renderer):
+            """
+            Initializes a new instance of JDDRenderer.Watched.
+            """
+            self.stream = stream
+            self.renderer = renderer
+
+        def write(self, text):
+            """
+            Writes text to the stream, after counting it.
+            """
+            self.renderer.wrote(text)
+            return self.stream.write(text)
+
+        def __getattr__(self, name):
+            # flush, isatty, fileno and the rest go straight to the stream
+            return getattr(self.stream, name)
+
+    def write(self, text):
+        """
+        Writes text to the output in one call and flushes it.
+        """
+        stream = self.output()
+        stream.write(text)
+        stream.flush()
+
+    def clear(self):
+        """
+        Clears the screen and forgets the last frame.
+        """
+        self.previous = None
+        if self.uses_ansi(self.output()):
+            self.write(self.HOME + self.CLEAR_SCREEN)
+
+    def invalidate(self):
+        """
+        Forgets the last frame so the next one is drawn in full.
+        """
+        self.previous = None
+
+    def draw(self, lines):
+        """
+        Draws a frame, only rewriting the rows that changed since the last frame.
+
+        Parameters:
+        lines (list of str): The lines of the frame, top to bottom.
+        """
+        self.write(self.render(lines))
+
+    def render(self, lines):
+        """
+        Works out what needs to be written to draw a frame, without writing it. Used when the 
+        frame should go out together with other output, like a JDDMenuIO buffer.
+
+        Parameters:
+        lines (list of str): The lines of the frame, top to bottom.
+
+        Returns:
+        str: The text (and escape sequences) to write.
+        """
+        rows = []
+        for line in lines:
+            rows.extend(str(line).split("\n"))
+        if not self.uses_ansi(self.output()):
+            self.previous = None
+            return "\n".join(rows) + "\n"
+        previous = self.previous
+        size = self.size()
+        # Rows can only be rewritten in place if the old frame is still on screen where it was drawn and the new one fits,
+        # without any row wrapping onto the next (which would push every row after it down)
+        fits = len(rows) < size.lines and all(len(row) <= size.columns for row in rows)
+        if previous is None or not fits:
+            parts = [self.HOME, self.CLEAR_SCREEN, "\n".join(rows), "\n"]
+        else:
+            parts = []
+            for index, row in enumerate(rows):
+                if index >= len(previous) or previous[index] != row:
+                    parts.append(f"\x1b[{index + 1};1H{row}{self.CLEAR_LINE}")
+            # Puts the cursor under the frame and clears whatever was written there since the last frame
+            parts.append(f"\x1b[{len(rows) + 1};1H{self.CLEAR_BELOW}")
+        # A frame that doesn't fit scrolled or wrapped, so the next one can't be drawn over it row by row
+        self.previous = rows if fits else None
+        self.below = self.column = 0
+        self.unsent = "".join(parts)
+        return self.unsent
+
+
+class JDDMenuNav:
+    """
+    A navigation result returned by a menu action to say which menu should be displayed next.
+
+    Instead of an action opening the next menu itself (which nests one more display_menu loop on the 
+    call stack every time), it returns one of these and lets JDDMenuNavigator open the next menu.
+
+    Kinds:
+        PUSH - Opens a new menu on top of the current one. Exiting it goes back to the current one.
+        REPLACE - Swaps the current menu for another one (or rebuilds it, if given the same name).
+        POP - Closes the current menu. If a menu name is given, keeps closing menus until that one is on top.
+        EXIT - Closes every menu.
+
+    Usage example:
+        builder.add_option("Move", lambda ctx: JDDMenuNav.push("moveMenu"))
+        builder.add_option("Go back", lambda ctx: JDDMenuNav.pop())
+    """
+    PUSH = "push"
+    REPLACE = "replace"
+    POP = "pop"
+    EXIT = "exit"
+
+    __slots__ = ("kind", "menu_name")
+
+    def __init__(self, kind, menu_name=None):
+        """
+        Initializes a new instance of JDDMenuNav.
+        """
+        self.kind = kind
+        self.menu_name = menu_name
+
+    @staticmethod
+    def push(menu_name):
+        """
+        Returns:
+        JDDMenuNav: A result that opens menu_name on top of the current menu.
+        """
+        return JDDMenuNav(JDDMenuNav.PUSH, menu_name)
+
+    @staticmethod
+    def replace(menu_name):
+        """
+        Returns:
+        JDDMenuNav: A result that swaps the current menu for menu_name.
+        """
+        return JDDMenuNav(JDDMenuNav.REPLACE, menu_name)
+
+    @staticmethod
+    def pop(menu_name=None):
+        """
+        Parameters:
+        menu_name (str): Optional, the menu to go back to. If it is not open, it replaces the current menu.
+
+        Returns:
+        JDDMenuNav: A result that closes the current menu.
+        """
+        return JDDMenuNav(JDDMenuNav.POP, menu_name)
+
+    @staticmethod
+    def exit():
+        """
+        Returns:
+        JDDMenuNav: A result that closes every open menu.
+        """
+        return JDDMenuNav(JDDMenuNav.EXIT)
+
+
+class JDDMenuNavigator:
+    """
+    Drives a stack of named menus from a single loop.
+
+    The navigator asks a factory for the menu on top of the stack, displays it, and then applies the
+    JDDMenuNav that the menu returned. Menus are rebuilt every time they come back to the top, so they 
+    always reflect the current state of the application. Because no action ever opens a menu itself, 
+    memory use stays the same no matter how many times the user goes between menus.
+
+    Attributes:
+        menu_factory (callable): Takes a menu name and returns a JDDMenu, or None if the menu can't be shown
+                                 (a menu that can't be shown is closed).
+        stack (list of str): The names of the open menus, with the current one last.
+        current (JDDMenu or None): The menu waiting for input, when driven with start/feed.
+
+    Usage example:
+        menus = {"main": main_builder, "settings": settings_builder}
+        navigator = JDDMenuNavigator(lambda name: menus[name].build())
+        navigator.run("main")
+
+        # Or, without blocking on input
+        navigator.start("main")
+        while navigator.feed(next_line_from_somewhere()):
+            pass
+    """
+
+    def __init__(self, menu_factory):
+        """
+        Initializes a new instance of JDDMenuNavigator.
+        """
+        if not callable(menu_factory):
+            raise ValueError(f"The provided menu factory '{menu_factory}' is not callable")
+        self.menu_factory = menu_factory
+        self.stack = []
+        self.current = None
+
+    def run(self, menu_name, context=None):
+        """
+        Displays menu_name and every menu navigated to from it, until the last open menu is closed.
+
+        Parameters:
+        menu_name (str): The name of the first menu to display.
+        context (dict): discussed within the module level docstring, passed to every menu.
+        """
+        self.stack = [menu_name]
+        while self.stack:
+            menu = self.menu_factory(self.stack[-1])
+            if menu is None:
+                self.stack.pop()
+                continue
+            self.navigate(menu.display_menu(context))
+
+    def start(self, menu_name):
+        """
+        Opens menu_name and shows it, without waiting for input. Use feed() to hand it each line the user types.
+
+        Parameters:
+        menu_name (str): The name of the first menu to display.
+
+        Returns:
+        bool: True while there is a menu open and waiting for input.
+        """
+        self.stack = [menu_name]
+        self.current = None
+        return self.show_current()
+
+    def feed(self, line, context=None):
+        """
+        Handles one line of input in the current menu, then shows whichever menu is open next.
+        Nothing here waits for input, so one program can drive many navigators at once.
+        A line with several choices ("1 1 3 2") runs them all, each in whichever menu the last one left open, 
+        and only the menu open at the end is shown. Over a connection that is one round trip instead of one per choice.
+
+        Parameters:
+        line (str): The user's input.
+        context (dict): discussed within the module level docstring, passed to the menu.
+
+        Returns:
+        bool: True while there is a menu open and waiting for input, False once every menu is closed.
+        """
+        if self.current is None:
+            return False
+        io = self.current.io
+        line = io.typeahead(line)
+        while True:
+            io.logged(line)
+            result = self.current.select(line, context)
+            if result is not JDDMenu.STAY:
+                self.current = None
+                self.navigate(result)
+            # select clears pending on an invalid choice, so the rest of a mistyped line isn't run
+            if not io.pending or not self.open_current():
+                break
+            line = io.pending.popleft()
+        return self.show_current()
+
+    def show_current(self):
+        """
+        Shows the menu on top of the stack and its prompt, building it first if it isn't already up.
+
+        Returns:
+        bool: True if a menu was shown, False if the stack is empty.
+        """
+        if not self.open_current():
+            return False
+        self.current.show()
+        self.current.io.show_prompt(self.current.prompt)
+        return True
+
+    def open_current(self):
+        """
+        Builds the menu on top of the stack if it isn't already up, without showing it.
+
+        Returns:
+        bool: True if there is a menu open, False if the stack is empty.
+        """
+        while self.current is None and self.stack:
+            self.current = self.menu_factory(self.stack[-1])
+            if self.current is None:
+                self.stack.pop()
+        return self.current is not None
+
+    def navigate(self, nav):
+        """
+        Applies a navigation result to the stack. None (the user exited the menu) closes the current menu.
+
+        Parameters:
+        nav (JDDMenuNav or None): The result returned by JDDMenu.display_menu.
+        """
+        if nav is None:
+            self.stack.pop()
+        elif nav.kind == JDDMenuNav.PUSH:
+            self.stack.append(nav.menu_name)
+        elif nav.kind == JDDMenuNav.REPLACE:
+            self.stack[-1] = nav.menu_name
+        elif nav.kind == JDDMenuNav.POP:
+            if nav.menu_name is None:
+                self.stack.pop()
+            elif nav.menu_name in self.stack:
+                # Goes back to the most recent copy of that menu
+                del self.stack[len(self.stack) - self.stack[::-1].index(nav.menu_name):]
+            else:
+                self.stack[-1] = nav.menu_name
+        elif nav.kind == JDDMenuNav.EXIT:
+            self.stack.clear()
+        else:
+            raise ValueError(f"Unknown navigation kind '{nav.kind}'")
 
 
 class JDDMenuUtils:
@@ -0,0 +1,387 @@
+"""
+JDDServer - Hosts many JDDGame sessions in one process over plain line based TCP connections
+
+Every connection gets its own GameState, GameEngine and GameUI, but they all share one parsed (and frozen)
+copy of the GameData file. Sessions are driven a line at a time through JDDMenuNavigator.start/feed, so no
+session ever blocks the event loop waiting on its player. The game's pauses don't block either, the session's
+GamePacer turns them into markers in its output and the server waits them out with asyncio.sleep before
+sending the rest, so one player's dramatic pause never holds up anyone else. Sending anything during a pause
+skips the rest of them, a blank line only skips, anything else is also taken as the player's next input.
+Several choices can be sent on one line ("1 1 3 2"), they run back to back and only the last menu is sent.
+
+Sessions that haven't sent a line in --idle-timeout seconds are disconnected and dropped.
+
+With --workers N, a supervisor process spreads sessions over N worker processes (one core each). The supervisor
+opens the listening socket and every worker accepts from it, so the OS hands each new connection to whichever
+worker gets to it first. The game data is compiled once by the supervisor into a GameDataImage in shared memory,
+and every worker uses it in place instead of loading its own copy. Workers that die are restarted.
+
+Instructions for use:
+    - python JDDServer.py path/to/GameData.JSON
+    - python JDDServer.py path/to/GameData.JSON --host 0.0.0.0 --port 4000 --idle-timeout 600
+    - Connect with any line based client, for example: nc localhost 4000 (or telnet localhost 4000)
+    - --world path/to/BigWorld.jddpack streams the map from a world pack, shared by every session
+    - python JDDServer.py path/to/GameData.JSON --workers 4 to use 4 cores
+    - --metrics metrics.json writes call counts and latencies of every action (all sessions together) when the server
+      stops, each worker writes its own file with its process ID added. --profile-dir writes a cProfile file per session.
+    - python JDDServer.py --help for the rest of the options
+"""
+
+import argparse
+import asyncio
+import contextlib
+import cProfile
+import multiprocessing
+import multiprocessing.connection
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+import uuid
+from multiprocessing import shared_memory
+
+from JDDGame import (GameData, GameDataImage, GameState, GameEngine, GameUI, GamePacer, GameRecording, GameSave, GameWorldPack,
+                     GameMetrics)
+from JDDMenu_v2_6 import JDDMenuIO, JDDMenuNavigator
+
+
+class SessionOutput:
+    #COMMENT Everything a session has written since it was last sent, text and pauses in the order they happened
+    #NOTE Pauses are stored as floats (seconds to wait) between the strings of text
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text):
+        if text:
+            self.parts.append(text)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        #NOTE Keeps the session's renderer on plain full frames, line based clients don't understand escape sequences
+        return False
+
+    def pause(self, seconds):
+        #COMMENT Used as the session pacer's sleep, so a pause waits in the output instead of in the game
+        self.parts.append(float(seconds))
+
+    def drain(self):
+        #COMMENT Hands over everything written so far and starts again empty
+        parts, self.parts = self.parts, []
+        return parts
+
+
+class GameSession:
+    #COMMENT One player's game, driven a line of input at a time
+    def __init__(self, game_data, config_path, time_scale=None, world_pack=None, save_path=None, record=False,
+                 metrics=None, profile=False):
+        self.output = SessionOutput()
+        self.io = JDDMenuIO(output_stream=self.output)
+        #COMMENT Keeps every line the player sends so the session can be saved as a GameRecording
+        if record:
+            self.io.log = []
+        with contextlib.redirect_stdout(self.output):
+            self.game_state = GameState(config_path, game_data=game_data, time_scale=time_scale, io=self.io,
+                                        world_pack=world_pack, save_path=save_path, metrics=metrics)
+            #NOTE Same speed as a normal game state, but pausing writes a marker instead of sleeping
+            self.game_state.pacer = GamePacer(self.game_state.pacer.time_scale, sleep=self.output.pause)
+            self.game_engine = GameEngine(game_state=self.game_state, config_path=config_path)
+            self.game_ui = GameUI(game_state=self.game_state, game_engine=self.game_engine, config_path=config_path,
+                                  game_data=game_data)
+        self.navigator = JDDMenuNavigator(self.game_ui.get_menu)
+        self.running = False
+        #COMMENT Profiles this session's steps only, see step
+        self.profiler = cProfile.Profile() if profile else None
+
+    def start(self, menu_name='Main_Menu'):
+        #COMMENT Opens the first menu, returns the output to send
+        return self.step(self.navigator.start, menu_name)
+
+    def feed(self, line):
+        #COMMENT Handles one line from the player, returns the output to send
+        return self.step(self.navigator.feed, line)
+
+    def step(self, action, value):
+        #COMMENT Runs one step of the game with everything it prints going to this session's output
+        #NOTE Steps never await, so swapping sys.stdout for the length of one can't mix up two sessions' output
+        #NOTE The same goes for the profiler, nothing but this session runs while it is on
+        with contextlib.redirect_stdout(self.output):
+            if self.profiler is not None:
+                self.profiler.enable()
+            try:
+                self.running = action(value)
+            except SystemExit:
+                #NOTE The endings call exit(), here that only ends this session
+                self.running = False
+            finally:
+                if self.profiler is not None:
+                    self.profiler.disable()
+            self.io.flush()
+        return self.output.drain()
+
+
+class GameServer:
+    #COMMENT Accepts connections and runs a GameSession for each one, all on one event loop
+    def __init__(self, game_data, config_path, time_scale=None, idle_timeout=600, world_pack=None, save_dir=None,
+                 max_line=1024, record_dir=None, metrics_path=None, profile_dir=None):
+        self.game_data = game_data
+        self.config_path = config_path
+        self.time_scale = time_scale
+        self.idle_timeout = idle_timeout
+        self.world_pack = world_pack
+        self.save_dir = save_dir if save_dir is not None else tempfile.gettempdir()
+        self.max_line = max_line
+        #COMMENT Where to write a GameRecording of every session when it ends, None to not record
+        self.record_dir = record_dir
+        #COMMENT Every session's actions are timed into one GameMetrics, written to metrics_path by save_metrics
+        self.metrics_path = metrics_path
+        self.metrics = GameMetrics() if metrics_path is not None else None
+        #COMMENT Where to write a cProfile file for every session when it ends, None to not profile
+        self.profile_dir = profile_dir
+        self.sessions = set()
+
+    def new_session(self):
+        #COMMENT Each session saves to its own file, so players can't load each other's games
+        session_id = uuid.uuid4().hex
+        save_path = os.path.join(self.save_dir, f"JDDGame-{session_id}{GameSave.SUFFIX}")
+        session = GameSession(self.game_data, self.config_path, self.time_scale, self.world_pack, save_path,
+                              record=self.record_dir is not None, metrics=self.metrics, profile=self.profile_dir is not None)
+        session.session_id = session_id
+        return session
+
+    def record(self, session):
+        #COMMENT Saves a finished session as a recording named after it, replay it with python JDDGame.py --replay
+        try:
+            GameRecording.capture(session.game_state).save(os.path.join(self.record_dir, f"JDDGame-{session.session_id}.jddrec"))
+        except OSError as error:
+            print(f"Could not record session {session.session_id}: {error}")
+
+    def save_profile(self, session):
+        #COMMENT Writes a finished session's profile, named after it like its recording
+        try:
+            session.profiler.dump_stats(os.path.join(self.profile_dir, f"JDDGame-{session.session_id}.prof"))
+        except OSError as error:
+            print(f"Could not save the profile of session {session.session_id}: {error}")
+
+    def save_metrics(self):
+        #COMMENT Writes the timings of every session so far, does nothing if metrics are off
+        if self.metrics is None:
+            return
+        try:
+            self.metrics.save(self.metrics_path)
+        except OSError as error:
+            print(f"Could not save metrics to {self.metrics_path}: {error}")
+
+    async def handle(self, reader, writer):
+        #COMMENT Runs one connection's session until the game ends, the player leaves or goes idle
+        #NOTE The next line is read while the last output is still being sent, so a player who sends something
+        #NOTE during a pause skips the rest of the pauses (see send) and their line is handled straight after
+        session = self.new_session()
+        self.sessions.add(session)
+        reading = None
+        try:
+            parts = session.start()
+            while True:
+                reading = asyncio.ensure_future(reader.readline())
+                skipped = await self.send(writer, parts, reading)
+                if not session.running:
+                    break
+                try:
+                    line = await asyncio.wait_for(reading, self.idle_timeout)
+                except asyncio.TimeoutError:
+                    writer.write(b"\nDisconnected for being idle.\n")
+                    break
+                except ValueError:
+                    #NOTE readline raises this for a line longer than max_line
+                    writer.write(b"\nLine too long, disconnecting.\n")
+                    break
+                if not line:
+                    break
+                line = line.decode('utf-8', 'replace').rstrip('\r\n')
+                if skipped and not line.strip():
+                    #COMMENT A blank line sent to skip the pauses isn't meant as input, wait for the next one
+                    parts = []
+                    continue
+                parts = session.feed(line)
+        except ConnectionError:
+            pass
+        finally:
+            if reading is not None and not reading.done():
+                reading.cancel()
+            self.sessions.discard(session)
+            if self.record_dir is not None:
+                self.record(session)
+            if self.profile_dir is not None:
+                self.save_profile(session)
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def send(self, writer, parts, reading=None):
+        #COMMENT Sends a session's output, waiting out its pauses along the way
+        #NOTE If reading (the player's next line) finishes during a pause, the rest is sent without pausing, returns True if so
+        skipped = False
+        for part in parts:
+            if writer.is_closing():
+                #NOTE The player is gone (the transport closes itself after a failed send), stop talking to them
+                raise ConnectionResetError("Connection lost")
+            if isinstance(part, float):
+                if skipped:
+                    continue
+                await writer.drain()
+                if reading is None:
+                    await asyncio.sleep(part)
+                else:
+                    await asyncio.wait((reading,), timeout=part)
+                    skipped = reading.done()
+            else:
+                writer.write(part.encode('utf-8'))
+        await writer.drain()
+        return skipped
+
+    async def start(self, host='127.0.0.1', port=4000, sock=None):
+        #COMMENT Starts listening (or accepting from an already listening socket), returns the asyncio server
+        if sock is not None:
+            return await asyncio.start_server(self.handle, sock=sock, limit=self.max_line)
+        return await asyncio.start_server(self.handle, host, port, limit=self.max_line)
+
+    async def serve(self, host='127.0.0.1', port=4000, sock=None, announce=True):
+        #COMMENT Listens and serves until cancelled
+        server = await self.start(host, port, sock)
+        if announce:
+            addresses = ", ".join(str(listener.getsockname()) for listener in server.sockets)
+            print(f"JDDServer listening on {addresses}")
+        async with server:
+            await server.serve_forever()
+
+
+class GameSupervisor:
+    #COMMENT Runs a GameServer in each of several worker processes, all accepting from one listening socket
+    #NOTE The game data goes into shared memory once, as a GameDataImage, and every worker maps that same copy
+    def __init__(self, game_data, config_path, workers, server_options=None, world_path=None):
+        self.config_path = config_path
+        self.workers = workers
+        #COMMENT Keyword arguments for each worker's GameServer (time_scale, idle_timeout, save_dir, ...)
+        self.server_options = server_options if server_options is not None else {}
+        self.world_path = world_path
+        self.image = GameDataImage.build(game_data)
+        self.shared = None
+        self.processes = []
+
+    def run(self, host='127.0.0.1', port=4000):
+        #COMMENT Starts the workers and keeps them running until interrupted
+        self.shared = shared_memory.SharedMemory(create=True, size=len(self.image))
+        listener = socket.create_server((host, port), backlog=1024)
+        try:
+            self.shared.buf[:len(self.image)] = self.image
+            #NOTE The supervisor doesn't serve anyone, so it has no need to keep its own copy around
+            self.image = None
+            print(f"JDDServer listening on {listener.getsockname()} with {self.workers} workers")
+            self.processes = [self.start_worker(listener) for _ in range(self.workers)]
+            while True:
+                #COMMENT Sleeps until a worker exits, then replaces it
+                multiprocessing.connection.wait([process.sentinel for process in self.processes])
+                for index, process in enumerate(self.processes):
+                    if not process.is_alive():
+                        print(f"Worker {process.pid} exited with code {process.exitcode}, restarting it")
+                        self.processes[index] = self.start_worker(listener)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+            listener.close()
+
+    def start_worker(self, listener):
+        process = multiprocessing.Process(target=run_worker, daemon=True,
+                                          args=(self.shared.name, listener, self.config_path, self.world_path, self.server_options))
+        process.start()
+        return process
+
+    def stop(self, grace=5):
+        #COMMENT Stops every worker and frees the shared memory
+        #NOTE Ctrl+C reaches the whole process group, so the workers are usually already saving their metrics,
+        #NOTE they get grace seconds to finish before being terminated
+        deadline = time.monotonic() + grace
+        for process in self.processes:
+            process.join(max(0, deadline - time.monotonic()))
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+        if self.shared is not None:
+            self.shared.close()
+            self.shared.unlink()
+            self.shared = None
+
+
+def run_worker(shared_name, listener, config_path, world_path, server_options):
+    #COMMENT Entry point of a worker process, serves sessions from the shared game data until it is stopped
+    #NOTE The shared memory is never closed here, the game data reads from it until the process ends
+    shared = shared_memory.SharedMemory(name=shared_name)
+    game_data = GameDataImage.load(shared.buf, config_path)
+    world_pack = GameWorldPack(world_path) if world_path else None
+    if server_options.get('metrics_path'):
+        #COMMENT Workers can't share one GameMetrics, so each writes its own file
+        root, extension = os.path.splitext(server_options['metrics_path'])
+        server_options = dict(server_options, metrics_path=f"{root}.{os.getpid()}{extension}")
+    server = GameServer(game_data, config_path, world_pack=world_pack, **server_options)
+    #NOTE The supervisor stops workers with SIGTERM, treated like Ctrl+C so the worker still writes its metrics
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(server.serve(sock=listener, announce=False))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        #NOTE A second Ctrl+C or the supervisor's SIGTERM mustn't cut the metrics short, the worker ends right after anyway
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        server.save_metrics()
+
+
+def main(argv=None):
+    #COMMENT Command line entry point
+    parser = argparse.ArgumentParser(description="Hosts many JDDGame sessions over TCP in one process.")
+    parser.add_argument('gamedata', help="Path to the GameData.JSON file")
+    parser.add_argument('--host', default='127.0.0.1', help="Address to listen on")
+    parser.add_argument('--port', type=int, default=4000, help="Port to listen on")
+    parser.add_argument('--idle-timeout', type=float, default=600, help="Seconds without input before a session is dropped")
+    parser.add_argument('--time-scale', type=float, default=None, help="Pause speed, see GamePacer (defaults to JDDGAME_TIME_SCALE)")
+    parser.add_argument('--world', default=None, help="Stream the map from this world pack")
+    parser.add_argument('--save-dir', default=None, help="Folder for session save files, defaults to the temp folder")
+    parser.add_argument('--record-dir', default=None, help="Save a replayable recording of every session to this folder")
+    parser.add_argument('--workers', type=int, default=1, help="Worker processes to spread sessions over, 1 serves from this process")
+    parser.add_argument('--metrics', default=None, help="Write call counts and latencies of every action to this file on shutdown")
+    parser.add_argument('--profile-dir', default=None, help="Save a cProfile file of every session to this folder")
+    args = parser.parse_args(argv)
+    if args.time_scale is None:
+        #NOTE Read here once so a bad JDDGAME_TIME_SCALE is reported on the server's console, not to the first player
+        args.time_scale = GamePacer.environment_scale()
+
+    game_data = GameData.load(args.gamedata)
+    for message in game_data.content.errors():
+        print(f"Game data error: {message}")
+    if args.workers > 1:
+        options = {'time_scale': args.time_scale, 'idle_timeout': args.idle_timeout, 'save_dir': args.save_dir,
+                   'record_dir': args.record_dir, 'metrics_path': args.metrics, 'profile_dir': args.profile_dir}
+        GameSupervisor(game_data, args.gamedata, args.workers, options, args.world).run(args.host, args.port)
+        return 0
+    world_pack = GameWorldPack(args.world) if args.world else None
+    server = GameServer(game_data, args.gamedata, args.time_scale, args.idle_timeout, world_pack, args.save_dir,
+                        record_dir=args.record_dir, metrics_path=args.metrics, profile_dir=args.profile_dir)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.save_metrics()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())